@@ -0,0 +1,72 @@
+"""
+Signals revoking JWTs whose role or club claims became stale
+
+Tokens carry role flags and managed club IDs (see bgx_api/authentication.py).
+When these change, tokens issued earlier are rejected once the change is
+committed, and the client refreshes to get current claims. Password and
+active state changes also reject earlier refresh tokens. Saves that leave
+these fields unchanged (e.g. account activation) keep the tokens.
+"""
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, m2m_changed
+from django.dispatch import receiver
+from bgx_api.authentication import ROLE_CLAIMS, revoke_user_tokens
+from clubs.models import Club
+from .models import User
+
+
+# Fields carried as claims: a change invalidates issued access tokens
+CLAIM_FIELDS = set(ROLE_CLAIMS) | {'username'}
+
+# Credentials: a change invalidates issued refresh tokens as well
+CREDENTIAL_FIELDS = {'password', 'is_active'}
+
+TOKEN_FIELDS = CLAIM_FIELDS | CREDENTIAL_FIELDS
+
+
+def _revoke_on_commit(user_ids, refresh_tokens=False):
+    user_ids = list(user_ids)
+    transaction.on_commit(
+        lambda: [revoke_user_tokens(user_id, refresh_tokens) for user_id in user_ids]
+    )
+
+
+@receiver(pre_save, sender=User)
+def track_token_field_changes(sender, instance, update_fields, **kwargs):
+    """
+    Compare the token fields being saved with the stored row
+    Saves limited to other fields (e.g. last_login on login) skip the lookup
+    """
+    instance._changed_token_fields = set()
+    if instance._state.adding:
+        return
+    
+    fields = TOKEN_FIELDS if update_fields is None else TOKEN_FIELDS.intersection(update_fields)
+    stored = User.objects.filter(pk=instance.pk).values(*fields).first() if fields else None
+    if stored is not None:
+        instance._changed_token_fields = {
+            field for field in fields if getattr(instance, field) != stored[field]
+        }
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_user_change(sender, instance, created, **kwargs):
+    """Revoke tokens when claims or credentials changed"""
+    changed = getattr(instance, '_changed_token_fields', set())
+    if created or not changed:
+        return
+    
+    _revoke_on_commit([instance.pk], refresh_tokens=bool(changed & CREDENTIAL_FIELDS))
+
+
+@receiver(m2m_changed, sender=Club.admins.through)
+def revoke_tokens_on_club_admins_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Revoke tokens of users added to or removed from club admins"""
+    if action in ('post_add', 'post_remove'):
+        user_ids = [instance.pk] if reverse else pk_set
+    elif action == 'pre_clear':
+        user_ids = [instance.pk] if reverse else instance.admins.values_list('pk', flat=True)
+    else:
+        return
+    
+    _revoke_on_commit(user_ids)
@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from bgx_api.authentication import ClaimsJWTAuthentication, ClaimsRefreshToken, revoke_user_tokens
+from .models import User
+
+
+class ClaimsJWTAuthenticationTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='rider', email='rider@example.com', is_rider=True)
+    
+    def setUp(self):
+        cache.clear()
+    
+    def authenticate(self, token, method='get'):
+        request = getattr(APIRequestFactory(), method)('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return ClaimsJWTAuthentication().authenticate(Request(request))
+    
+    def test_reads_use_claims_and_load_other_attributes(self):
+        user, token = self.authenticate(ClaimsRefreshToken.for_user(self.user).access_token)
+        with self.assertNumQueries(0):
+            self.assertTrue(user.is_rider)
+            self.assertFalse(user.is_system_admin)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'rider@example.com')
+        with self.assertNumQueries(1):
+            self.assertFalse(hasattr(user, 'rider_profile'))
+    
+    def test_tokens_issued_just_before_revocation_are_rejected(self):
+        token = ClaimsRefreshToken.for_user(self.user).access_token
+        revoke_user_tokens(self.user.id)
+        for method in ['get', 'post']:
+            with self.subTest(method=method), self.assertRaises(AuthenticationFailed):
+                self.authenticate(token, method)
+    
+    def test_token_issued_after_revocation_is_accepted(self):
+        revoke_user_tokens(self.user.id)
+        user, token = self.authenticate(ClaimsRefreshToken.for_user(self.user).access_token)
+        self.assertEqual(user.id, self.user.id)
+
+
+class TokenRevocationTests(TestCase):
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='rider', email='rider@example.com')
+        self.user.set_password('secret-1')
+        self.user.generate_activation_code()
+        self.user.save()
+    
+    def get_me(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return self.client.get('/api/users/me/')
+    
+    def refresh(self, refresh):
+        self.client.credentials()
+        return self.client.post('/api/auth/refresh/', {'refresh': refresh}, format='json')
+    
+    def test_tokens_from_activation_are_accepted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/users/activate/', {'activation_code': self.user.activation_code}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_me(response.data['access']).status_code, 200)
+    
+    def test_password_change_revokes_refresh_tokens(self):
+        refresh = ClaimsRefreshToken.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('secret-2')
+            self.user.save()
+        
+        self.assertEqual(self.get_me(refresh.access_token).status_code, 401)
+        self.assertEqual(self.refresh(str(refresh)).status_code, 401)
+    
+    def test_role_change_revokes_access_tokens_only(self):
+        refresh = ClaimsRefreshToken.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_club_admin = True
+            self.user.save()
+        
+        self.assertEqual(self.get_me(refresh.access_token).status_code, 401)
+        response = self.refresh(str(refresh))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_me(response.data['access']).status_code, 200)
@@ -2,7 +2,7 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
-from rest_framework_simplejwt.tokens import RefreshToken
+from bgx_api.authentication import ClaimsRefreshToken
 from .models import User
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, 
@@ -36,14 +36,15 @@ class UserViewSet(viewsets.ModelViewSet):
         Remove SessionAuthentication for public endpoints to avoid CSRF issues.
         For unauthenticated POST requests, use only JWT authentication.
         """
-        from rest_framework_simplejwt.authentication import JWTAuthentication
+        from bgx_api.authentication import ClaimsJWTAuthentication
         # Only use JWT for public endpoints (no session auth to avoid CSRF issues)
-        return [JWTAuthentication()]
+        return [ClaimsJWTAuthentication()]
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def me(self, request):
         """Get current user info"""
-        serializer = self.get_serializer(request.user)
+        # Reads are authenticated from token claims, the profile needs the full row
+        serializer = self.get_serializer(User.objects.get(pk=request.user.pk))
         return Response(serializer.data)
     
     def create(self, request, *args, **kwargs):
@@ -78,7 +79,7 @@ class UserViewSet(viewsets.ModelViewSet):
         user.activate()
         
         # Generate tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsRefreshToken.for_user(user)
         
         return Response({
             'message': 'Account activated successfully!',
@@ -0,0 +1,174 @@
+"""
+JWT authentication with role claims for the BGX API
+
+Tokens carry the user's role flags and managed club IDs as signed claims.
+Read requests (GET/HEAD/OPTIONS) are authenticated with a lightweight
+ClaimsTokenUser built from those claims, without loading the user row
+(other attributes, e.g. email or rider_profile, load it on first use);
+writes load the full user as before.
+
+Claims are refreshed whenever a token is refreshed. When a user's roles or
+club memberships change, access tokens issued before the change are
+rejected through a denylist in the cache (see accounts/signals.py), so the
+client refreshes and gets current claims. When the password or active
+state changes, refresh tokens issued before are rejected as well.
+"iat" carries fractional seconds, so tokens issued right after a
+revocation are not caught by it.
+With several server processes the cache must be shared (e.g. DatabaseCache
+or Redis), otherwise the denylist is only seen by one process.
+"""
+import time
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework import permissions
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+ROLE_CLAIMS = ['is_system_admin', 'is_club_admin', 'is_rider', 'is_staff', 'is_superuser']
+
+# Claim with the IDs of the clubs the user administers
+CLUBS_CLAIM = 'clubs'
+
+
+def get_user_claims(user):
+    """Role and club claims of a user"""
+    claims = {claim: getattr(user, claim) for claim in ROLE_CLAIMS}
+    claims['username'] = user.get_username()
+    claims[CLUBS_CLAIM] = list(user.managed_clubs.values_list('id', flat=True))
+    return claims
+
+
+def _denylist_key(user_id, token_type='access'):
+    return f'auth:{token_type}_tokens_not_before:{user_id}'
+
+
+def revoke_user_tokens(user_id, refresh_tokens=False):
+    """
+    Reject access tokens of the user issued before now (until they expire)
+    With refresh_tokens (password or active state changed) refresh tokens
+    issued before now are rejected too, so the user has to log in again.
+    """
+    now = time.time()
+    cache.set(_denylist_key(user_id), now, api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    if refresh_tokens:
+        cache.set(
+            _denylist_key(user_id, 'refresh'),
+            now,
+            api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()
+        )
+
+
+def is_token_revoked(validated_token):
+    token_type = 'refresh' if validated_token.get(api_settings.TOKEN_TYPE_CLAIM) == 'refresh' else 'access'
+    not_before = cache.get(_denylist_key(validated_token[api_settings.USER_ID_CLAIM], token_type))
+    return not_before is not None and validated_token.get('iat', 0) < not_before
+
+
+class ClaimsTokenUser(TokenUser):
+    """
+    User of read requests, built from the token claims
+    
+    Attributes without a claim (email, rider_profile, managed_clubs, ...)
+    are taken from the user row, loaded on first use, instead of being None.
+    """
+    
+    def __getattr__(self, attr):
+        if attr.startswith('_') or attr == 'token':
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        return getattr(self.user, attr)
+    
+    @cached_property
+    def user(self):
+        """The full user row"""
+        user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: self.id}).first()
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        return user
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token (and its access tokens) with the user's role and club claims"""
+    
+    def set_iat(self, claim='iat', at_time=None):
+        """Issue time with fractional seconds (a JWT NumericDate), see is_token_revoked"""
+        self.payload[claim] = (at_time or self.current_time).timestamp()
+    
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim, value in get_user_claims(user).items():
+            token[claim] = value
+        return token
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    token_class = ClaimsRefreshToken
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """
+    Refresh with current claims: the user is loaded once per refresh, so
+    role and club changes reach the client with the next access token
+    """
+    token_class = ClaimsRefreshToken
+    
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if is_token_revoked(refresh):
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+        
+        user = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}
+        ).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(_('User not found or inactive'), code='user_inactive')
+        
+        for claim, value in get_user_claims(user).items():
+            refresh[claim] = value
+        # Access tokens copy "iat" from the refresh token, it must be past revocation
+        refresh.set_iat()
+        
+        return super().validate({**attrs, 'refresh': str(refresh)})
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds the user from the token claims on reads
+    
+    Writes and tokens issued without claims load the user row
+    (JWTAuthentication behaviour). Revoked tokens are rejected in both cases.
+    """
+    
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        
+        validated_token = self.get_validated_token(raw_token)
+        
+        if api_settings.USER_ID_CLAIM in validated_token and is_token_revoked(validated_token):
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+        
+        if request.method in permissions.SAFE_METHODS and CLUBS_CLAIM in validated_token:
+            return ClaimsTokenUser(validated_token), validated_token
+        
+        return self.get_user(validated_token), validated_token
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    """OpenAPI security scheme (same Bearer JWT as simplejwt)"""
+    target_class = 'bgx_api.authentication.ClaimsJWTAuthentication'
@@ -0,0 +1,21 @@
+"""
+Shared database expressions
+"""
+from django.db import models
+
+
+class SubqueryCount(models.Subquery):
+    """
+    Count the rows of a correlated subquery, e.g.
+    SubqueryCount(RaceParticipation.objects.filter(race=OuterRef('pk')).values('pk'))
+    Select distinct values to count distinct rows, e.g. .values('rider').distinct()
+    
+    Unlike Count() over a join it needs no GROUP BY, so it does not multiply
+    rows when combined with other counts and stays correct inside Prefetch
+    querysets that are filtered through the same relation.
+    """
+    template = '(SELECT COUNT(*) FROM (%(subquery)s) _count)'
+    output_field = models.IntegerField()
+
+    def __init__(self, queryset, **extra):
+        super().__init__(queryset.order_by(), **extra)
@@ -0,0 +1,151 @@
+"""
+Per-request performance instrumentation
+
+RequestMetricsMiddleware records, for every request, the number of SQL
+queries, time spent in the database, time spent in DRF serializers and the
+total latency. The numbers are kept in an in-process ring buffer that admins
+can inspect at /api/request-metrics/. Server-Timing and X-Query-Count headers
+are only added with DEBUG on or for system admins, other clients do not see
+internal timings.
+"""
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+from rest_framework.serializers import BaseSerializer
+
+
+# Most recent request metrics (oldest entries are dropped)
+recent_requests = deque(maxlen=getattr(settings, 'REQUEST_METRICS_BUFFER_SIZE', 1000))
+
+_state = threading.local()
+
+
+class _QueryTimer:
+    """Database execute wrapper that counts queries and accumulates their time"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+def _timed_serializer_data(data_property):
+    """
+    Wrap BaseSerializer.data so time spent serializing is accumulated per request
+    Only the outermost serializer is timed, nested .data calls are included in it
+    """
+    def data(self):
+        if getattr(_state, 'serializer_time', None) is None or _state.serializer_depth:
+            _state.serializer_depth = getattr(_state, 'serializer_depth', 0) + 1
+            try:
+                return data_property.fget(self)
+            finally:
+                _state.serializer_depth -= 1
+        
+        _state.serializer_depth = 1
+        started = time.perf_counter()
+        try:
+            return data_property.fget(self)
+        finally:
+            _state.serializer_time += time.perf_counter() - started
+            _state.serializer_depth = 0
+    
+    data._request_metrics = True
+    return property(data)
+
+
+def _exposes_metrics(request):
+    """Whether the response may carry the metrics headers"""
+    if settings.DEBUG:
+        return True
+    # DRF authentication sets the (e.g. JWT) user on the underlying request too
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_authenticated and (
+        getattr(user, 'is_system_admin', False) or user.is_staff
+    ))
+
+
+class RequestMetricsMiddleware:
+    """
+    Record query count, DB time, serializer time and total latency per request
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        
+        self.get_response = get_response
+        
+        if not getattr(BaseSerializer.data.fget, '_request_metrics', False):
+            BaseSerializer.data = _timed_serializer_data(BaseSerializer.data)
+
+    def __call__(self, request):
+        query_timer = _QueryTimer()
+        _state.serializer_time = 0.0
+        _state.serializer_depth = 0
+        
+        started = time.perf_counter()
+        try:
+            with _ExecuteWrappers(query_timer):
+                response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - started
+            serializer_time = _state.serializer_time
+            _state.serializer_time = None
+        
+        resolver_match = getattr(request, 'resolver_match', None)
+        view_name = resolver_match.view_name if resolver_match else ''
+        
+        metrics = {
+            'timestamp': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            'queries': query_timer.count,
+            'db_ms': round(query_timer.duration * 1000, 2),
+            'serializer_ms': round(serializer_time * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }
+        recent_requests.append(metrics)
+        
+        if not _exposes_metrics(request):
+            return response
+        
+        response['Server-Timing'] = (
+            f'db;dur={metrics["db_ms"]};desc="{metrics["queries"]} queries", '
+            f'serializer;dur={metrics["serializer_ms"]}, '
+            f'total;dur={metrics["total_ms"]}'
+        )
+        response['X-Query-Count'] = str(metrics['queries'])
+        return response
+
+
+class _ExecuteWrappers:
+    """Install an execute wrapper on every configured database connection"""
+
+    def __init__(self, wrapper):
+        self.wrapper = wrapper
+        self.contexts = []
+
+    def __enter__(self):
+        for alias in connections:
+            context = connections[alias].execute_wrapper(self.wrapper)
+            context.__enter__()
+            self.contexts.append(context)
+        return self
+
+    def __exit__(self, *exc_info):
+        while self.contexts:
+            self.contexts.pop().__exit__(*exc_info)
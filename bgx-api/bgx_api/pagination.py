@@ -0,0 +1,180 @@
+"""
+Custom pagination classes for the BGX API
+"""
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+
+
+class OptionalCursorPagination(CursorPagination):
+    """
+    Page number pagination unless the client opts in to cursor pagination
+    with ?pagination=cursor (the next/previous links carry the cursor)
+    
+    Cursor pages are keyed on all columns of the view's `cursor_ordering`
+    (which must end in a unique column and match a composite index), so a
+    page is fetched with an index range scan and deep pages cost the same as
+    the first one (no COUNT(*) and no OFFSET).
+    
+    NULLs of nullable columns sort last (first when paging backwards); their
+    indexes need the same NULLS LAST order to be used for the scan.
+    """
+    
+    def use_cursor(self, request):
+        return (
+            request.query_params.get('pagination') == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+    
+    def get_ordering(self, request, queryset, view):
+        return view.cursor_ordering
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_cursor(request):
+            self.page_number_pagination = PageNumberPagination()
+            page = self.page_number_pagination.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.page_number_pagination.display_page_controls
+            return page
+        
+        self.page_number_pagination = None
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor.reverse if self.cursor else False
+        position = None
+        if self.cursor and self.cursor.position:
+            try:
+                position = json.loads(self.cursor.position)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+        
+        columns = self._columns(queryset, reverse)
+        queryset = queryset.order_by(*self._order_by(columns, reverse))
+        if position is not None:
+            try:
+                position = [
+                    None if value is None else field.to_python(value)
+                    for (attr, descending, field), value in zip(columns, position)
+                ]
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(self._after_position(columns, position, nulls_first=reverse))
+        
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        
+        self.display_page_controls = self.template is not None and bool(self.page) and (
+            self.has_next or self.has_previous
+        )
+        return self.page
+    
+    def _columns(self, queryset, reverse):
+        """(name, descending, model field) of each ordering column, flipped when paging backwards"""
+        columns = []
+        for field in self.ordering:
+            attr = field.lstrip('-')
+            columns.append((attr, field.startswith('-') != reverse, queryset.model._meta.get_field(attr)))
+        return columns
+    
+    def _order_by(self, columns, reverse):
+        """Plain ordering, with explicit NULLS placement on nullable columns only"""
+        ordering = []
+        for attr, descending, field in columns:
+            if not field.null:
+                ordering.append(('-' if descending else '') + attr)
+                continue
+            expression = F(attr).desc if descending else F(attr).asc
+            ordering.append(expression(**{'nulls_first' if reverse else 'nulls_last': True}))
+        return ordering
+    
+    def _after_position(self, columns, position, nulls_first=False):
+        """
+        Rows after position: (a > x) OR (a = x AND b > y) OR ...
+        
+        AND-ed with a bound on the leading column (a >= x), so the database can
+        start a range scan of the composite index at the position instead of
+        filtering all remaining rows. NULL values compare as the last (or
+        first, with nulls_first) value of their column.
+        """
+        condition = Q()
+        equal = Q()
+        for (attr, descending, field), value in zip(columns, position):
+            if value is None:
+                # Only non-NULL values follow a NULL, and only when NULLs come first
+                after = Q(**{attr + '__isnull': False}) if nulls_first else None
+                same = Q(**{attr + '__isnull': True})
+            else:
+                after = Q(**{attr + ('__lt' if descending else '__gt'): value})
+                if field.null and not nulls_first:
+                    after |= Q(**{attr + '__isnull': True})
+                same = Q(**{attr: value})
+            if after is not None:
+                condition |= equal & after
+            equal &= same
+        
+        (attr, descending, field), value = columns[0], position[0]
+        if value is None:
+            bound = None if nulls_first else Q(**{attr + '__isnull': True})
+        else:
+            bound = Q(**{attr + ('__lte' if descending else '__gte'): value})
+            if field.null and not nulls_first:
+                bound |= Q(**{attr + '__isnull': True})
+        return condition & bound if bound is not None else condition
+    
+    def _get_position_from_instance(self, instance, ordering):
+        values = [getattr(instance, field.lstrip('-')) for field in ordering]
+        return json.dumps([None if value is None else str(value) for value in values])
+    
+    def get_next_link(self):
+        if self.page_number_pagination is not None:
+            return self.page_number_pagination.get_next_link()
+        if not (self.has_next and self.page):
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+    
+    def get_previous_link(self):
+        if self.page_number_pagination is not None:
+            return self.page_number_pagination.get_previous_link()
+        if not (self.has_previous and self.page):
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+    
+    def get_paginated_response(self, data):
+        if self.page_number_pagination is not None:
+            return self.page_number_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
+    
+    def to_html(self):
+        if self.page_number_pagination is not None:
+            return self.page_number_pagination.to_html()
+        return super().to_html()
+    
+    def get_paginated_response_schema(self, schema):
+        return PageNumberPagination().get_paginated_response_schema(schema)
+    
+    def get_schema_operation_parameters(self, view):
+        return PageNumberPagination().get_schema_operation_parameters(view) + [
+            {
+                'name': 'pagination',
+                'required': False,
+                'in': 'query',
+                'description': 'Use "cursor" for cursor pagination (stable cost for deep pages)',
+                'schema': {'type': 'string', 'enum': ['cursor']},
+            },
+        ] + super().get_schema_operation_parameters(view)
@@ -1,7 +1,61 @@
 """
 Custom permission classes for the BGX API
 """
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework import permissions
+from .authentication import CLUBS_CLAIM
+
+
+def get_managed_club_ids(request):
+    """
+    IDs of the clubs administered by the request's user
+    
+    Taken from the token's club claim when present (see
+    bgx_api/authentication.py). Otherwise loaded once per request; with a
+    JWT the IDs are also cached per token for ORGANIZER_CACHE_TIMEOUT
+    seconds, so a change of club admins is seen by existing tokens within
+    that time.
+    """
+    if hasattr(request, '_managed_club_ids'):
+        return request._managed_club_ids
+    
+    user = request.user
+    claims = request.auth if hasattr(request.auth, 'get') else {}
+    if not (user and user.is_authenticated):
+        club_ids = frozenset()
+    elif CLUBS_CLAIM in claims:
+        club_ids = frozenset(claims[CLUBS_CLAIM])
+    else:
+        token_id = claims.get('jti')
+        key = f'permissions:managed_clubs:{user.pk}:{token_id}'
+        club_ids = cache.get(key) if token_id else None
+        if club_ids is None:
+            club_ids = frozenset(user.managed_clubs.values_list('id', flat=True))
+            if token_id:
+                cache.set(key, club_ids, settings.ORGANIZER_CACHE_TIMEOUT)
+    
+    request._managed_club_ids = club_ids
+    return club_ids
+
+
+def is_race_organizer(request, race):
+    """
+    Whether the request's user administers one of the race's organizing clubs
+    Answered from memory for users without clubs and for races with
+    prefetched organizers, otherwise with a single lookup of the join table
+    """
+    club_ids = get_managed_club_ids(request)
+    if not club_ids:
+        return False
+    
+    organizers = getattr(race, '_prefetched_objects_cache', {}).get('organizers')
+    if organizers is not None:
+        return any(club.pk in club_ids for club in organizers)
+    
+    return type(race).organizers.through.objects.filter(
+        race_id=race.pk, club_id__in=club_ids
+    ).exists()
 
 
 class IsSystemAdmin(permissions.BasePermission):
@@ -39,7 +93,7 @@ class IsClubAdminOrReadOnly(permissions.BasePermission):
         
         # Club admins can only modify their own club
         if hasattr(obj, 'admins'):
-            return obj.admins.filter(id=request.user.id).exists()
+            return obj.pk in get_managed_club_ids(request)
         
         return False
 
@@ -96,5 +150,5 @@ class IsRaceOrganizer(permissions.BasePermission):
         else:
             return False
         
-        return race.organizers.filter(admins=request.user).exists()
+        return is_race_organizer(request, race)
 
@@ -54,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bgx_api.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -102,6 +103,19 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Local memory by default; use a shared backend (e.g. DatabaseCache, Redis)
+# when running several processes so cache invalidation reaches all of them
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'bgx-api'),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -181,7 +195,7 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'bgx_api.authentication.ClaimsJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -208,6 +222,9 @@ SIMPLE_JWT = {
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    # Role flags and managed clubs as claims (see bgx_api/authentication.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'bgx_api.authentication.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'bgx_api.authentication.TokenRefreshSerializer',
 }
 
 # DRF Spectacular settings (API documentation)
@@ -219,6 +236,41 @@ SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
 
+# Results recalculation
+# When enabled, result writes and the recalculate endpoints queue jobs that are
+# processed by `python manage.py run_recalculation_worker` instead of
+# recalculating inside the request
+RESULTS_ASYNC_RECALCULATION = os.environ.get('RESULTS_ASYNC_RECALCULATION', 'False') == 'True'
+
+# Seconds after which a running job is considered abandoned (e.g. its worker
+# crashed) and is claimed again by the next worker
+RESULTS_JOB_STALE_TIMEOUT = int(os.environ.get('RESULTS_JOB_STALE_TIMEOUT', '1800'))
+
+# Days completed and failed jobs are kept before the worker deletes them
+# (0 keeps them forever)
+RESULTS_JOB_RETENTION_DAYS = int(os.environ.get('RESULTS_JOB_RETENTION_DAYS', '30'))
+
+# How tied race results (same points and time) are positioned:
+# 'sequential' (1, 2, 3), 'competition' (1, 2, 2, 4) or 'dense' (1, 2, 2, 3)
+RESULTS_TIE_POSITIONS = os.environ.get('RESULTS_TIE_POSITIONS', 'sequential')
+
+# Per-request metrics (query count, DB/serializer time, latency) returned in
+# the Server-Timing header (with DEBUG or to admins only); the most recent
+# requests are kept in memory and listed at /api/request-metrics/ (admins only)
+REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS_ENABLED', 'True') == 'True'
+REQUEST_METRICS_BUFFER_SIZE = int(os.environ.get('REQUEST_METRICS_BUFFER_SIZE', '1000'))
+
+# Response cache of public standings/results endpoints (see results/cache.py);
+# entries are invalidated by recalculation, the timeout only bounds staleness
+# of names and other details shown next to the results
+RESULTS_CACHE_ENABLED = os.environ.get('RESULTS_CACHE_ENABLED', 'True') == 'True'
+RESULTS_CACHE_ALIAS = os.environ.get('RESULTS_CACHE_ALIAS', 'default')
+RESULTS_CACHE_TIMEOUT = int(os.environ.get('RESULTS_CACHE_TIMEOUT', '600'))
+
+# Seconds the club IDs a user administers are cached per access token
+# (race organizer checks, see bgx_api/permissions.py)
+ORGANIZER_CACHE_TIMEOUT = int(os.environ.get('ORGANIZER_CACHE_TIMEOUT', '60'))
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = os.environ.get(
     'CORS_ALLOWED_ORIGINS', 
@@ -21,7 +21,7 @@ from django.conf.urls.static import static
 from rest_framework import routers
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
-from .views import health_check, set_language, get_language
+from .views import health_check, set_language, get_language, request_metrics
 
 # Import viewsets
 from accounts.views import UserViewSet
@@ -31,7 +31,7 @@ from championships.views import ChampionshipViewSet
 from races.views import RaceViewSet, RaceDayViewSet, RaceParticipationViewSet
 from results.views import (
     RaceDayResultViewSet, RaceResultViewSet,
-    ChampionshipResultViewSet, ClubResultViewSet
+    ChampionshipResultViewSet, ClubResultViewSet, RecalculationJobViewSet
 )
 
 # Create router and register viewsets
@@ -47,6 +47,7 @@ router.register(r'results/race-day-results', RaceDayResultViewSet, basename='rac
 router.register(r'results/race-results', RaceResultViewSet, basename='raceresult')
 router.register(r'results/championship-results', ChampionshipResultViewSet, basename='championshipresult')
 router.register(r'results/club-standings', ClubResultViewSet, basename='clubresult')
+router.register(r'results/recalculation-jobs', RecalculationJobViewSet, basename='recalculationjob')
 
 urlpatterns = [
     # Admin
@@ -59,6 +60,9 @@ urlpatterns = [
     path('api/set-language/', set_language, name='set_language'),
     path('api/get-language/', get_language, name='get_language'),
     
+    # Request metrics (admins only)
+    path('api/request-metrics/', request_metrics, name='request_metrics'),
+    
     # Authentication endpoints
     path('api/auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -2,6 +2,10 @@ from django.http import JsonResponse
 from django.utils import translation
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from .instrumentation import recent_requests
+from .permissions import IsSystemAdmin
 import json
 
 
@@ -69,3 +73,50 @@ def get_language(request):
         'language': current_language,
         'supported_languages': ['en', 'bg']
     })
+
+
+@api_view(['GET'])
+@permission_classes([IsSystemAdmin])
+def request_metrics(request):
+    """
+    Recent per-request metrics with a per-view summary (admins only)
+    Query params: view (view name), limit (number of recent requests, default 100)
+    """
+    entries = list(recent_requests)
+    
+    view_name = request.query_params.get('view')
+    if view_name:
+        entries = [entry for entry in entries if entry['view'] == view_name]
+    
+    # Summarize per view
+    by_view = {}
+    for entry in entries:
+        by_view.setdefault(entry['view'], []).append(entry)
+    
+    summary = []
+    for name, view_entries in by_view.items():
+        latencies = sorted(entry['total_ms'] for entry in view_entries)
+        count = len(view_entries)
+        summary.append({
+            'view': name,
+            'requests': count,
+            'avg_queries': round(sum(entry['queries'] for entry in view_entries) / count, 1),
+            'max_queries': max(entry['queries'] for entry in view_entries),
+            'avg_db_ms': round(sum(entry['db_ms'] for entry in view_entries) / count, 2),
+            'avg_serializer_ms': round(sum(entry['serializer_ms'] for entry in view_entries) / count, 2),
+            'p50_ms': latencies[(count - 1) // 2],
+            'p95_ms': latencies[min(count - 1, int(count * 0.95))],
+            'max_ms': latencies[-1],
+        })
+    summary.sort(key=lambda item: item['p95_ms'], reverse=True)
+    
+    try:
+        limit = int(request.query_params.get('limit', 100))
+    except ValueError:
+        limit = 100
+    
+    return Response({
+        'buffer_size': recent_requests.maxlen,
+        'summary': summary,
+        'recent': entries[-limit:][::-1] if limit > 0 else [],
+    })
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Championship
+from .models import Championship, PointSchema
 from races.models import Race
 
 
@@ -70,12 +70,19 @@ class RaceInline(admin.TabularInline):
         return True
 
 
+class PointSchemaInline(admin.TabularInline):
+    """Inline editor for the championship's point schemas"""
+    model = PointSchema
+    extra = 0
+    fields = ['race_day_type', 'points']
+
+
 @admin.register(Championship)
 class ChampionshipAdmin(admin.ModelAdmin):
     list_display = ['name', 'year', 'start_date', 'end_date', 'status', 'race_count', 'created_at']
     list_filter = ['year', 'status']
     search_fields = ['name', 'year']
-    inlines = [RaceInline]
+    inlines = [RaceInline, PointSchemaInline]
     
     fieldsets = (
         ('Basic Information', {
@@ -1,4 +1,41 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from races.models import RaceDay
+from bgx_api.db import SubqueryCount
+
+
+class ChampionshipQuerySet(models.QuerySet):
+    """QuerySet for championships"""
+    
+    def with_counts(self):
+        """Annotate race_count"""
+        from races.models import Race
+        
+        return self.annotate(
+            race_count=SubqueryCount(
+                Race.championships.through.objects.filter(
+                    championship=models.OuterRef('pk')
+                ).values('pk')
+            )
+        )
+    
+    def with_details(self):
+        """
+        Annotate race_count and participant_count (distinct riders confirmed in
+        any of the championship's races) and prefetch the races with their
+        organizers and counts, for the championship detail
+        """
+        from races.models import Race, RaceParticipation
+        
+        return self.with_counts().annotate(
+            participant_count=SubqueryCount(
+                RaceParticipation.objects.filter(
+                    race__championships=models.OuterRef('pk'), status='confirmed'
+                ).values('rider').distinct()
+            )
+        ).prefetch_related(
+            models.Prefetch('races', queryset=Race.objects.with_counts())
+        )
 
 
 class Championship(models.Model):
@@ -25,6 +62,8 @@ class Championship(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ChampionshipQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-year', 'name']
         verbose_name = 'Championship'
@@ -34,3 +73,41 @@ class Championship(models.Model):
     def __str__(self):
         return f"{self.name} {self.year}"
 
+
+
+class PointSchema(models.Model):
+    """Points awarded per finishing position in a championship"""
+    
+    championship = models.ForeignKey(
+        Championship,
+        on_delete=models.CASCADE,
+        related_name='point_schemas'
+    )
+    race_day_type = models.CharField(
+        max_length=20,
+        choices=RaceDay.TYPE_CHOICES,
+        blank=True,
+        help_text="Race day type this schema applies to (leave blank for all types)"
+    )
+    points = models.JSONField(
+        default=list,
+        help_text="Points for positions 1, 2, 3, ... e.g. [25, 20, 16, 13, 11]"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['championship', 'race_day_type']
+        verbose_name = 'Point Schema'
+        verbose_name_plural = 'Point Schemas'
+        unique_together = ['championship', 'race_day_type']
+    
+    def __str__(self):
+        return f"{self.championship} - {self.get_race_day_type_display() or 'All race days'}"
+    
+    def clean(self):
+        if not isinstance(self.points, list) or not all(
+            isinstance(points, (int, float)) and points >= 0 for points in self.points
+        ):
+            raise ValidationError({'points': 'Points must be a list of non-negative numbers.'})
@@ -2,6 +2,13 @@ from rest_framework import serializers
 from .models import Championship
 
 
+def _race_count(championship):
+    """Races in the championship, annotated by Championship.objects.with_counts()"""
+    if hasattr(championship, 'race_count'):
+        return championship.race_count
+    return championship.races.count()
+
+
 class ChampionshipListSerializer(serializers.ModelSerializer):
     """Minimal serializer for championship lists"""
     race_count = serializers.SerializerMethodField()
@@ -12,7 +19,7 @@ class ChampionshipListSerializer(serializers.ModelSerializer):
                   'status', 'race_count']
     
     def get_race_count(self, obj):
-        return obj.races.count()
+        return _race_count(obj)
 
 
 class ChampionshipSerializer(serializers.ModelSerializer):
@@ -27,7 +34,7 @@ class ChampionshipSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_race_count(self, obj):
-        return obj.races.count()
+        return _race_count(obj)
 
 
 class ChampionshipDetailSerializer(serializers.ModelSerializer):
@@ -43,19 +50,18 @@ class ChampionshipDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_races(self, obj):
+        # Races are prefetched with their counts by Championship.objects.with_details()
         from races.serializers import RaceListSerializer
         return RaceListSerializer(obj.races.all(), many=True).data
     
     def get_participant_count(self, obj):
         # Count unique riders across all races in this championship
-        from riders.models import Rider
-        rider_ids = set()
-        for race in obj.races.all():
-            race_rider_ids = race.participations.filter(
-                status='confirmed'
-            ).values_list('rider_id', flat=True)
-            rider_ids.update(race_rider_ids)
-        return len(rider_ids)
+        if hasattr(obj, 'participant_count'):
+            return obj.participant_count
+        from races.models import RaceParticipation
+        return RaceParticipation.objects.filter(
+            race__championships=obj, status='confirmed'
+        ).values('rider').distinct().count()
 
 
 class ChampionshipWriteSerializer(serializers.ModelSerializer):
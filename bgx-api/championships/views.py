@@ -15,7 +15,14 @@ class ChampionshipViewSet(viewsets.ModelViewSet):
     List/detail: all users
     Create/Update/Delete: system admins only
     """
-    queryset = Championship.objects.all()
+    queryset = Championship.objects.with_counts()
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            # Participant count and races with their counts in a fixed number of queries
+            queryset = queryset.with_details()
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -27,7 +34,7 @@ class ChampionshipViewSet(viewsets.ModelViewSet):
         return ChampionshipSerializer
     
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'export']:
             return [permissions.AllowAny()]
         return [permissions.IsAuthenticated()]
     
@@ -51,20 +58,44 @@ class ChampionshipViewSet(viewsets.ModelViewSet):
         """Get all races in this championship"""
         championship = self.get_object()
         from races.serializers import RaceListSerializer
-        serializer = RaceListSerializer(championship.races.all(), many=True)
+        serializer = RaceListSerializer(championship.races.with_counts(), many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
-    def standings(self, request, pk=None):
-        """Get championship standings"""
+    def export(self, request, pk=None):
+        """Download the standings as CSV (?category= for a single category)"""
+        from results.export import championship_standings_csv, export_filename, streaming_csv_response
+        
         championship = self.get_object()
+        header, rows = championship_standings_csv(championship, request.query_params.get('category'))
+        return streaming_csv_response(
+            export_filename(f'{championship.name} {championship.year} standings', f'championship-{championship.id}'),
+            header,
+            rows
+        )
+    
+    @action(detail=True, methods=['get'])
+    def standings(self, request, pk=None):
+        """Get championship standings (cached until the championship is recalculated)"""
         from results.serializers import ChampionshipResultSerializer
         from results.models import ChampionshipResult
+        from results.cache import cached_response, conditional_response
+        
+        # Resolve the championship first: unknown or malformed IDs are a 404
+        championship = self.get_object()
         
-        standings = ChampionshipResult.objects.filter(
-            championship=championship
-        ).order_by('-total_points', 'rider__last_name')
+        def build_response():
+            standings = ChampionshipResult.objects.filter(
+                championship=championship
+            ).select_related('championship', 'rider__club').order_by('-total_points', 'rider__last_name')
+            
+            serializer = ChampionshipResultSerializer(standings, many=True)
+            return Response(serializer.data)
         
-        serializer = ChampionshipResultSerializer(standings, many=True)
-        return Response(serializer.data)
+        return conditional_response(
+            request,
+            ChampionshipResult.objects.filter(championship_id=championship.pk),
+            lambda: cached_response(request, [('championship', championship.pk)], build_response),
+            scopes=[('championship', championship.pk)]
+        )
 
@@ -1,5 +1,20 @@
 from django.db import models
 from django.conf import settings
+from bgx_api.db import SubqueryCount
+
+
+class ClubQuerySet(models.QuerySet):
+    """QuerySet for clubs"""
+    
+    def with_counts(self):
+        """Annotate member_count"""
+        from riders.models import Rider
+        
+        return self.annotate(
+            member_count=SubqueryCount(
+                Rider.objects.filter(club=models.OuterRef('pk')).values('pk')
+            )
+        )
 
 
 class Club(models.Model):
@@ -32,6 +47,8 @@ class Club(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ClubQuerySet.as_manager()
+    
     class Meta:
         ordering = ['name']
         verbose_name = 'Club'
@@ -2,6 +2,13 @@ from rest_framework import serializers
 from .models import Club
 
 
+def _member_count(club):
+    """Riders in the club, annotated by Club.objects.with_counts()"""
+    if hasattr(club, 'member_count'):
+        return club.member_count
+    return club.riders.count()
+
+
 class ClubListSerializer(serializers.ModelSerializer):
     """Minimal serializer for club lists"""
     member_count = serializers.SerializerMethodField()
@@ -11,7 +18,7 @@ class ClubListSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'logo', 'city', 'country', 'member_count']
     
     def get_member_count(self, obj):
-        return obj.riders.count()
+        return _member_count(obj)
 
 
 class ClubSerializer(serializers.ModelSerializer):
@@ -29,7 +36,7 @@ class ClubSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at', 'member_count', 'admin_count']
     
     def get_member_count(self, obj):
-        return obj.riders.count()
+        return _member_count(obj)
     
     def get_admin_count(self, obj):
         return obj.admins.count()
@@ -55,7 +62,7 @@ class ClubDetailSerializer(serializers.ModelSerializer):
         return UserSerializer(obj.admins.all(), many=True).data
     
     def get_member_count(self, obj):
-        return obj.riders.count()
+        return _member_count(obj)
     
     def get_organized_races_count(self, obj):
         return obj.organized_races.count()
@@ -1,6 +1,7 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from bgx_api.permissions import get_managed_club_ids
 from .models import Club
 from .serializers import (
     ClubListSerializer, ClubSerializer, 
@@ -15,7 +16,7 @@ class ClubViewSet(viewsets.ModelViewSet):
     Create/Delete: system admins only
     Update: system admins or club admins
     """
-    queryset = Club.objects.all()
+    queryset = Club.objects.with_counts()
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -40,9 +41,9 @@ class ClubViewSet(viewsets.ModelViewSet):
     
     def perform_update(self, serializer):
         # System admins or club admins can update
-        club = self.get_object()
+        club = serializer.instance
         user = self.request.user
-        if not (user.is_system_admin or user.is_staff or club.admins.filter(id=user.id).exists()):
+        if not (user.is_system_admin or user.is_staff or club.id in get_managed_club_ids(self.request)):
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied("Only system administrators or club admins can update this club.")
         serializer.save()
@@ -67,6 +68,6 @@ class ClubViewSet(viewsets.ModelViewSet):
         """Get all races organized by this club"""
         club = self.get_object()
         from races.serializers import RaceListSerializer
-        serializer = RaceListSerializer(club.organized_races.all(), many=True)
+        serializer = RaceListSerializer(club.organized_races.with_counts(), many=True)
         return Response(serializer.data)
 
@@ -14,6 +14,9 @@ echo "Running database migrations..."
 python manage.py makemigrations --noinput || true
 python manage.py migrate --noinput
 
+# Create the cache table (only used with the database cache backend)
+python manage.py createcachetable
+
 # Collect static files
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
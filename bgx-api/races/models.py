@@ -1,4 +1,32 @@
 from django.db import models
+from bgx_api.db import SubqueryCount
+
+
+class RaceQuerySet(models.QuerySet):
+    """QuerySet for races"""
+    
+    def with_counts(self):
+        """
+        Annotate participant_count (confirmed) and day_count, and prefetch
+        organizers and championships with their own counts, so race
+        serializers need no per-row queries
+        """
+        from clubs.models import Club
+        from championships.models import Championship
+        
+        return self.annotate(
+            participant_count=SubqueryCount(
+                RaceParticipation.objects.filter(
+                    race=models.OuterRef('pk'), status='confirmed'
+                ).values('pk')
+            ),
+            day_count=SubqueryCount(
+                RaceDay.objects.filter(race=models.OuterRef('pk')).values('pk')
+            ),
+        ).prefetch_related(
+            models.Prefetch('organizers', queryset=Club.objects.with_counts()),
+            models.Prefetch('championships', queryset=Championship.objects.with_counts()),
+        )
 
 
 class Race(models.Model):
@@ -40,6 +68,8 @@ class Race(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = RaceQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-start_date']
         verbose_name = 'Race'
@@ -126,6 +156,21 @@ class RaceParticipation(models.Model):
         verbose_name = 'Race Participation'
         verbose_name_plural = 'Race Participations'
         unique_together = ['race', 'rider']
+        indexes = [
+            # Confirmed participants of a race (result calculations, participant counts)
+            models.Index(
+                fields=['race', 'category'],
+                include=['rider'],
+                condition=models.Q(status='confirmed'),
+                name='participation_confirmed_idx'
+            ),
+            # Confirmed participations of a rider (races_participated)
+            models.Index(
+                fields=['rider'],
+                condition=models.Q(status='confirmed'),
+                name='participation_rider_conf_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.rider.full_name} - {self.race.name} ({self.category})"
@@ -4,6 +4,13 @@ from clubs.serializers import ClubListSerializer
 from riders.serializers import RiderListSerializer
 
 
+def _participant_count(race):
+    """Confirmed participants, annotated by Race.objects.with_counts()"""
+    if hasattr(race, 'participant_count'):
+        return race.participant_count
+    return race.participations.filter(status='confirmed').count()
+
+
 class RaceListSerializer(serializers.ModelSerializer):
     """Minimal serializer for race lists"""
     organizer_names = serializers.SerializerMethodField()
@@ -18,7 +25,7 @@ class RaceListSerializer(serializers.ModelSerializer):
         return [organizer.name for organizer in obj.organizers.all()]
     
     def get_participant_count(self, obj):
-        return obj.participations.filter(status='confirmed').count()
+        return _participant_count(obj)
 
 
 class RaceDaySerializer(serializers.ModelSerializer):
@@ -62,9 +69,11 @@ class RaceSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_participant_count(self, obj):
-        return obj.participations.filter(status='confirmed').count()
+        return _participant_count(obj)
     
     def get_day_count(self, obj):
+        if hasattr(obj, 'day_count'):
+            return obj.day_count
         return obj.race_days.count()
 
 
@@ -88,7 +97,7 @@ class RaceDetailSerializer(serializers.ModelSerializer):
         return ChampionshipListSerializer(obj.championships.all(), many=True).data
     
     def get_participant_count(self, obj):
-        return obj.participations.filter(status='confirmed').count()
+        return _participant_count(obj)
 
 
 class RaceWriteSerializer(serializers.ModelSerializer):
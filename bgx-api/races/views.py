@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from django.utils import timezone
+from bgx_api.permissions import is_race_organizer
 from .models import Race, RaceDay, RaceParticipation
 from .serializers import (
     RaceListSerializer, RaceSerializer, RaceDetailSerializer,
@@ -17,7 +18,7 @@ class RaceViewSet(viewsets.ModelViewSet):
     List/detail: all users
     Create/Update/Delete: system admins or club admins
     """
-    queryset = Race.objects.prefetch_related('organizers', 'championships', 'race_days').all()
+    queryset = Race.objects.with_counts().prefetch_related('race_days')
     filterset_fields = ['championships', 'status', 'location']
     
     def get_serializer_class(self):
@@ -32,7 +33,7 @@ class RaceViewSet(viewsets.ModelViewSet):
         return RaceSerializer
     
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'participants', 'results']:
+        if self.action in ['list', 'retrieve', 'participants', 'results', 'export']:
             return [permissions.AllowAny()]
         return [permissions.IsAuthenticated()]
     
@@ -43,11 +44,11 @@ class RaceViewSet(viewsets.ModelViewSet):
         serializer.save()
     
     def perform_update(self, serializer):
-        race = self.get_object()
+        race = serializer.instance
         user = self.request.user
         
         # Check if user is system admin, staff, or organizer of this race
-        is_organizer = race.organizers.filter(admins=user).exists()
+        is_organizer = is_race_organizer(self.request, race)
         
         if not (user.is_system_admin or user.is_staff or is_organizer):
             raise PermissionDenied("You don't have permission to update this race.")
@@ -113,14 +114,40 @@ class RaceViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def results(self, request, pk=None):
-        """Get race results"""
-        race = self.get_object()
+        """Get race results (cached until the race is recalculated)"""
         from results.serializers import RaceResultSerializer
         from results.models import RaceResult
+        from results.cache import cached_response, conditional_response
         
-        results = RaceResult.objects.filter(race=race).order_by('overall_position')
-        serializer = RaceResultSerializer(results, many=True)
-        return Response(serializer.data)
+        # Resolve the race first: unknown or malformed IDs are a 404
+        race = self.get_object()
+        
+        def build_response():
+            results = RaceResult.objects.filter(race=race).select_related(
+                'race', 'rider__club'
+            ).order_by('overall_position')
+            serializer = RaceResultSerializer(results, many=True)
+            return Response(serializer.data)
+        
+        return conditional_response(
+            request,
+            RaceResult.objects.filter(race_id=race.pk),
+            lambda: cached_response(request, [('race', race.pk)], build_response),
+            scopes=[('race', race.pk)]
+        )
+    
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """Download the overall results as CSV (?category= for a single category)"""
+        from results.export import race_results_csv, export_filename, streaming_csv_response
+        
+        race = self.get_object()
+        header, rows = race_results_csv(race, request.query_params.get('category'))
+        return streaming_csv_response(
+            export_filename(f'{race.name} {race.start_date.year} results', f'race-{race.id}'),
+            header,
+            rows
+        )
     
     @action(detail=True, methods=['get', 'post'])
     def days(self, request, pk=None):
@@ -133,7 +160,7 @@ class RaceViewSet(viewsets.ModelViewSet):
         else:
             # Check permissions
             user = request.user
-            is_organizer = race.organizers.filter(admins=user).exists()
+            is_organizer = is_race_organizer(request, race)
             
             if not (user.is_system_admin or user.is_staff or is_organizer):
                 raise PermissionDenied("You don't have permission to create race days.")
@@ -155,10 +182,10 @@ class RaceDayViewSet(viewsets.ModelViewSet):
         return [permissions.IsAuthenticated()]
     
     def perform_update(self, serializer):
-        race_day = self.get_object()
+        race_day = serializer.instance
         user = self.request.user
         
-        is_organizer = race_day.race.organizers.filter(admins=user).exists()
+        is_organizer = is_race_organizer(self.request, race_day.race)
         
         if not (user.is_system_admin or user.is_staff or is_organizer):
             raise PermissionDenied("You don't have permission to update this race day.")
@@ -167,7 +194,7 @@ class RaceDayViewSet(viewsets.ModelViewSet):
     
     def perform_destroy(self, instance):
         user = self.request.user
-        is_organizer = instance.race.organizers.filter(admins=user).exists()
+        is_organizer = is_race_organizer(self.request, instance.race)
         
         if not (user.is_system_admin or user.is_staff or is_organizer):
             raise PermissionDenied("You don't have permission to delete this race day.")
@@ -176,14 +203,27 @@ class RaceDayViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def results(self, request, pk=None):
-        """Get results for this race day"""
-        race_day = self.get_object()
+        """Get results for this race day (cached until its results change)"""
         from results.serializers import RaceDayResultSerializer
         from results.models import RaceDayResult
+        from results.cache import cached_response, conditional_response
         
-        results = RaceDayResult.objects.filter(race_day=race_day).order_by('position')
-        serializer = RaceDayResultSerializer(results, many=True)
-        return Response(serializer.data)
+        # Resolve the race day first: unknown or malformed IDs are a 404
+        race_day = self.get_object()
+        
+        def build_response():
+            results = RaceDayResult.objects.filter(race_day=race_day).select_related(
+                'race_day', 'rider'
+            ).order_by('position')
+            serializer = RaceDayResultSerializer(results, many=True)
+            return Response(serializer.data)
+        
+        return conditional_response(
+            request,
+            RaceDayResult.objects.filter(race_day_id=race_day.pk),
+            lambda: cached_response(request, [('race_day', race_day.pk)], build_response),
+            scopes=[('race_day', race_day.pk)]
+        )
 
 
 class RaceParticipationViewSet(viewsets.ModelViewSet):
@@ -197,12 +237,12 @@ class RaceParticipationViewSet(viewsets.ModelViewSet):
         return [permissions.IsAuthenticated()]
     
     def perform_update(self, serializer):
-        participation = self.get_object()
+        participation = serializer.instance
         user = self.request.user
         
         # Riders can update their own participation, organizers can update any
-        is_organizer = participation.race.organizers.filter(admins=user).exists()
-        is_owner = participation.rider.user == user
+        is_organizer = is_race_organizer(self.request, participation.race)
+        is_owner = participation.rider.user_id == user.id
         
         if not (user.is_system_admin or user.is_staff or is_organizer or is_owner):
             raise PermissionDenied("You don't have permission to update this participation.")
@@ -211,8 +251,8 @@ class RaceParticipationViewSet(viewsets.ModelViewSet):
     
     def perform_destroy(self, instance):
         user = self.request.user
-        is_organizer = instance.race.organizers.filter(admins=user).exists()
-        is_owner = instance.rider.user == user
+        is_organizer = is_race_organizer(self.request, instance.race)
+        is_owner = instance.rider.user_id == user.id
         
         if not (user.is_system_admin or user.is_staff or is_organizer or is_owner):
             raise PermissionDenied("You don't have permission to delete this participation.")
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import RaceDayResult, RaceResult, ChampionshipResult, ClubResult
+from .models import RaceDayResult, RaceResult, ChampionshipResult, ClubResult, RecalculationJob
 
 
 @admin.register(RaceDayResult)
@@ -36,3 +36,11 @@ class ClubResultAdmin(admin.ModelAdmin):
     raw_id_fields = ['championship', 'club']
     readonly_fields = ['total_points']
 
+
+
+@admin.register(RecalculationJob)
+class RecalculationJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'race', 'championship', 'status', 'attempts', 'created_at', 'started_at', 'finished_at']
+    list_filter = ['status']
+    raw_id_fields = ['race', 'championship']
+    readonly_fields = ['attempts', 'started_at', 'finished_at', 'error']
@@ -0,0 +1,170 @@
+"""
+Versioned response cache and conditional GET for public results endpoints
+
+Rendered JSON of standings and results endpoints is cached under a key
+that includes a version counter per race, race day or championship.
+Recalculation bumps the counters of everything it touched (after commit),
+so the next request misses and renders fresh data; stale entries are never
+served and simply expire.
+
+The cache backend is configured in settings.CACHES (local memory by default).
+With several server processes or the recalculation worker use a shared
+backend, otherwise a bump is only seen by the process that made it.
+
+conditional_response() adds ETag/Last-Modified validators computed from the
+row count and latest updated_at of the results behind a response, and
+answers a matching If-None-Match/If-Modified-Since with 304 Not Modified
+before anything is serialized. Given the response's scopes, the validators
+are cached under the same versions, so a cache hit runs no query at all.
+"""
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+
+# Version of responses not scoped to a single race or championship
+ALL_RESULTS = ('results', 'all')
+
+
+def _cache():
+    return caches[settings.RESULTS_CACHE_ALIAS]
+
+
+def _version_key(scope, object_id):
+    return f'results:version:{scope}:{object_id}'
+
+
+def _initial_version():
+    # Time based, so a counter evicted from the cache never repeats an old version
+    return time.time_ns()
+
+
+def get_version(scope, object_id):
+    """Current version of a race, race day or championship"""
+    cache = _cache()
+    key = _version_key(scope, object_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_versions(keys):
+    cache = _cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Not cached yet: nothing can have been cached under it either
+            cache.add(key, _initial_version(), timeout=None)
+
+
+def bump_versions(races=(), race_days=(), championships=()):
+    """
+    Invalidate cached responses of the given races, race days and
+    championships (ids) once the current transaction commits
+    """
+    keys = [_version_key(*ALL_RESULTS)]
+    keys += [_version_key('race', race_id) for race_id in races]
+    keys += [_version_key('race_day', race_day_id) for race_day_id in race_days]
+    keys += [_version_key('championship', championship_id) for championship_id in championships]
+    transaction.on_commit(lambda: _bump_versions(keys))
+
+
+def _request_key(prefix, request, scopes):
+    """Cache key of a request URL under the current versions of scopes"""
+    versions = ':'.join(
+        f'{scope}-{object_id}-{get_version(scope, object_id)}' for scope, object_id in scopes
+    )
+    url_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'results:{prefix}:{versions}:{url_hash}'
+
+
+def cached_response(request, scopes, build_response):
+    """
+    Serve the rendered JSON of build_response() from the cache
+    
+    scopes: (scope, object_id) pairs whose versions the response depends on
+    build_response: callable returning the DRF Response on a cache miss
+    
+    Only successful JSON GET responses are cached; other requests
+    (e.g. the browsable API) are passed through.
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    if (not settings.RESULTS_CACHE_ENABLED or request.method != 'GET'
+            or renderer is None or renderer.format != 'json'):
+        return build_response()
+    
+    key = _request_key('response', request, scopes)
+    
+    cache = _cache()
+    content = cache.get(key)
+    if content is None:
+        response = build_response()
+        if response.status_code != 200:
+            return response
+        content = JSONRenderer().render(response.data)
+        cache.set(key, content, settings.RESULTS_CACHE_TIMEOUT)
+    
+    return HttpResponse(content, content_type='application/json')
+
+
+def _result_stats(queryset):
+    return queryset.order_by().aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+
+
+def conditional_response(request, queryset, build_response, scopes=None):
+    """
+    Conditional GET for the results in queryset
+    
+    The validators come from a single aggregate query (row count and latest
+    updated_at); when the client's copy is current a 304 is returned without
+    calling build_response(), otherwise its response gets ETag and
+    Last-Modified headers.
+    
+    scopes: (scope, object_id) pairs the results depend on; when given (and
+    the cache is enabled) the aggregate is cached under their versions
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return build_response()
+    
+    if scopes is not None and settings.RESULTS_CACHE_ENABLED:
+        cache = _cache()
+        key = _request_key('validators', request, scopes)
+        stats = cache.get(key)
+        if stats is None:
+            stats = _result_stats(queryset)
+            cache.set(key, stats, settings.RESULTS_CACHE_TIMEOUT)
+    else:
+        stats = _result_stats(queryset)
+    last_modified = stats['last_modified']
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    
+    # Different representations (JSON, browsable API) need different tags
+    renderer = getattr(request, 'accepted_renderer', None)
+    etag = '"{}-{}-{}"'.format(
+        renderer.format if renderer else '',
+        stats['count'],
+        last_modified.timestamp() if last_modified else 0
+    )
+    
+    not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+    
+    response = build_response()
+    if response.status_code == 200:
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+    return response
+
@@ -1,9 +1,22 @@
 """
 Points calculation utilities for race results
+
+Every recalculation runs in a single transaction, so readers see either the
+previous or the new standings and never a partially updated table. Derived
+rows that no longer apply (DNF/DSQ riders, deleted results, clubs without
+scoring riders) are removed in the same transaction. Cached responses of
+everything recalculated are invalidated once the transaction commits.
 """
 from datetime import timedelta
 from decimal import Decimal
+from functools import lru_cache
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum, Window
+from django.db.models.functions import DenseRank, Rank, RowNumber
+from django.utils import timezone
 from .models import RaceDayResult, RaceResult, ChampionshipResult, ClubResult
+from .cache import bump_versions
 
 
 # Default point schema (position -> points)
@@ -14,201 +27,440 @@ DEFAULT_POINT_SCHEMA = {
 }
 
 
+@lru_cache(maxsize=256)
+def _compile_point_table(points):
+    """
+    Compile points for positions 1..N into a lookup table of Decimals
+    Tables are cached in-process by content, so an edited schema compiles
+    into a new table and the old one is never used again
+    """
+    return tuple(Decimal(str(value)) for value in points)
+
+
+def compile_point_schema(point_schema):
+    """
+    Compile a point schema into an array-indexed lookup table
+    Accepts a position -> points dict or a list of points for positions 1, 2, 3, ...
+    """
+    if isinstance(point_schema, dict):
+        size = max(point_schema, default=0)
+        point_schema = [point_schema.get(position, 0) for position in range(1, size + 1)]
+    return _compile_point_table(tuple(point_schema))
+
+
+DEFAULT_POINT_TABLE = compile_point_schema(DEFAULT_POINT_SCHEMA)
+
+
+def get_point_table(race_day):
+    """
+    Get the compiled point table for a race day
+    
+    Uses the point schema of the race's championship for the race day type,
+    falling back to the championship's schema for all types and then to the
+    default schema. If the race belongs to several championships with a
+    schema, the most recent championship wins.
+    """
+    from championships.models import PointSchema
+    
+    schemas = PointSchema.objects.filter(
+        championship__races=race_day.race_id,
+        race_day_type__in=[race_day.type, '']
+    ).values_list('race_day_type', 'points', 'championship__year', 'championship__name')
+    
+    if not schemas:
+        return DEFAULT_POINT_TABLE
+    
+    race_day_type, points, year, name = min(
+        schemas,
+        key=lambda schema: (schema[0] == '', -schema[2], schema[3])
+    )
+    return compile_point_schema(points)
+
+
 def get_points_for_position(position, point_schema=None):
     """
     Get points for a given position based on the point schema
+    point_schema may be a compiled point table (see get_point_table)
     """
     if point_schema is None:
-        point_schema = DEFAULT_POINT_SCHEMA
+        point_table = DEFAULT_POINT_TABLE
+    elif isinstance(point_schema, tuple):
+        point_table = point_schema
+    else:
+        point_table = compile_point_schema(point_schema)
+    
+    if 0 < position <= len(point_table):
+        return point_table[position - 1]
+    return Decimal(0)
+
+
+def get_points_for_positions(positions, point_table=DEFAULT_POINT_TABLE):
+    """
+    Get points for many positions at once with a single lookup table
+    """
+    size = len(point_table)
+    zero = Decimal(0)
+    return [point_table[position - 1] if 0 < position <= size else zero for position in positions]
+
+
+def _aggregate_race_day_results(day_results):
+    """
+    Aggregate a rider's race day results into total points and total time
+    Returns None if the rider has a DNF or DSQ on any day
+    """
+    if any(result['dnf'] or result['dsq'] for result in day_results):
+        return None
+    
+    total_points = sum(result['points_earned'] for result in day_results)
+    
+    # Total time is only known if every day has a time
+    total_time = None
+    if all(result['time_taken'] for result in day_results):
+        total_time = sum(
+            (result['time_taken'] for result in day_results),
+            timedelta()
+        )
+        # Add penalties
+        total_penalties = sum(result['penalties'] for result in day_results)
+        if total_penalties:
+            total_time += timedelta(seconds=float(total_penalties))
+    
+    return total_points, total_time
+
+
+# Ranking functions for the supported tie semantics (RESULTS_TIE_POSITIONS)
+#   sequential:  1, 2, 3, 4 - ties broken by rider
+#   competition: 1, 2, 2, 4 - tied riders share a position, next one is skipped
+#   dense:       1, 2, 2, 3 - tied riders share a position, no gaps
+RANKING_FUNCTIONS = {
+    'sequential': RowNumber,
+    'competition': Rank,
+    'dense': DenseRank,
+}
+
+
+def _assign_positions(race_results):
+    """
+    Rank race results within each category and store overall_position
+    Most points first, then fastest time (untimed results last); positions
+    are computed by a window function and only changed rows are written,
+    with one bulk update
+    """
+    tie_positions = settings.RESULTS_TIE_POSITIONS
+    
+    order_by = [F('total_points').desc(), F('total_time').asc(nulls_last=True)]
+    if tie_positions == 'sequential':
+        order_by.append(F('rider_id').asc())
+    
+    ranked_results = race_results.annotate(
+        position=Window(
+            expression=RANKING_FUNCTIONS[tie_positions](),
+            partition_by=[F('category')],
+            order_by=order_by,
+        )
+    ).only('id', 'overall_position')
+    
+    # updated_at is bumped too, it drives the ETag of the results endpoints
+    now = timezone.now()
+    changed_results = []
+    for result in ranked_results:
+        if result.overall_position != result.position:
+            result.overall_position = result.position
+            result.updated_at = now
+            changed_results.append(result)
     
-    return Decimal(point_schema.get(position, 0))
+    RaceResult.objects.bulk_update(changed_results, ['overall_position', 'updated_at'])
 
 
+@transaction.atomic
 def calculate_race_results(race):
     """
     Calculate overall race results from race day results
     Aggregates all race days for each rider
+    
+    All race day results are loaded in a single query and aggregated in memory,
+    race results are written with one bulk upsert and ranked with a window function.
     """
     from races.models import RaceParticipation
     
-    # Get all participations for this race
-    participations = RaceParticipation.objects.filter(
-        race=race,
-        status='confirmed'
-    ).select_related('rider')
+    # Category of every confirmed participant in this race
+    rider_categories = dict(
+        RaceParticipation.objects.filter(
+            race=race,
+            status='confirmed'
+        ).values_list('rider_id', 'category')
+    )
     
-    for participation in participations:
-        rider = participation.rider
-        category = participation.category
-        
-        # Get all race day results for this rider in this race
-        day_results = RaceDayResult.objects.filter(
-            race_day__race=race,
-            rider=rider
-        )
-        
-        # Skip if no results yet
-        if not day_results.exists():
-            continue
-        
-        # Check for DNF or DSQ
-        has_dnf = day_results.filter(dnf=True).exists()
-        has_dsq = day_results.filter(dsq=True).exists()
+    # Group all race day results of confirmed participants by rider
+    day_results_by_rider = {}
+    day_results = RaceDayResult.objects.filter(
+        race_day__race=race,
+        rider_id__in=rider_categories.keys()
+    ).values('rider_id', 'points_earned', 'time_taken', 'penalties', 'dnf', 'dsq')
+    for result in day_results:
+        day_results_by_rider.setdefault(result['rider_id'], []).append(result)
+    
+    race_results = []
+    for rider_id, rider_day_results in day_results_by_rider.items():
+        totals = _aggregate_race_day_results(rider_day_results)
         
-        if has_dnf or has_dsq:
-            # Don't create/update race result for DNF/DSQ
+        # Don't create/update race result for DNF/DSQ
+        if totals is None:
             continue
         
-        # Calculate total points and time
-        total_points = sum(result.points_earned for result in day_results)
-        
-        # Calculate total time (if all results have time)
-        total_time = None
-        if all(result.time_taken for result in day_results):
-            total_time = sum(
-                (result.time_taken for result in day_results),
-                timedelta()
-            )
-            # Add penalties
-            total_penalties = sum(result.penalties for result in day_results)
-            if total_penalties:
-                total_time += timedelta(seconds=float(total_penalties))
-        
-        # Create or update race result
-        race_result, created = RaceResult.objects.update_or_create(
+        total_points, total_time = totals
+        race_results.append(RaceResult(
             race=race,
-            rider=rider,
-            defaults={
-                'category': category,
-                'total_points': total_points,
-                'total_time': total_time,
-                'overall_position': 0  # Will be calculated after all results
-            }
+            rider_id=rider_id,
+            category=rider_categories[rider_id],
+            total_points=total_points,
+            total_time=total_time,
+            overall_position=0  # Will be calculated after all results
+        ))
+    
+    if race_results:
+        RaceResult.objects.bulk_create(
+            race_results,
+            update_conflicts=True,
+            unique_fields=['race', 'rider'],
+            update_fields=['category', 'total_points', 'total_time', 'overall_position', 'updated_at']
         )
     
+    # Remove results of riders who no longer qualify (DNF/DSQ, unconfirmed or without results)
+    RaceResult.objects.filter(race=race).exclude(
+        rider_id__in=[result.rider_id for result in race_results]
+    ).delete()
+    
     # Calculate positions by category
-    categories = RaceResult.objects.filter(race=race).values_list('category', flat=True).distinct()
+    _assign_positions(RaceResult.objects.filter(race=race))
     
-    for category in categories:
-        category_results = RaceResult.objects.filter(
-            race=race,
-            category=category
-        ).order_by('-total_points', 'total_time')
-        
-        for position, result in enumerate(category_results, start=1):
-            result.overall_position = position
-            result.save()
+    bump_versions(races=[race.id])
     
     return RaceResult.objects.filter(race=race)
 
 
+@transaction.atomic
 def calculate_championship_results(championship):
     """
     Calculate championship standings from race results
     
     Special rule: If championship is completed and rider participated in ALL races,
     drop their lowest race score from the total.
+    
+    Standings for the whole championship are computed from a single grouped
+    aggregation over race results and written with one bulk upsert.
     """
-    from riders.models import Rider
+    bump_versions(championships=[championship.id])
     
+    if not _update_championship_results(championship):
+        # No races left, so no standings either
+        ChampionshipResult.objects.filter(championship=championship).delete()
+        return ChampionshipResult.objects.none()
+    
+    return ChampionshipResult.objects.filter(championship=championship)
+
+
+def _update_championship_results(championship, rider=None):
+    """
+    Upsert championship standings, optionally only for a single rider
+    Returns False if the championship has no races
+    """
     # Get all races in this championship
     races = championship.races.all()
     
-    if not races.exists():
-        return ChampionshipResult.objects.none()
-    
     total_races_in_championship = races.count()
+    if not total_races_in_championship:
+        return False
+    
     is_championship_completed = championship.status == 'completed'
     
-    # Get all riders who participated in any race
-    rider_ids = set()
-    for race in races:
-        race_rider_ids = RaceResult.objects.filter(
-            race=race
-        ).values_list('rider_id', flat=True)
-        rider_ids.update(race_rider_ids)
+    race_results = RaceResult.objects.filter(race__in=races)
+    if rider is not None:
+        race_results = race_results.filter(rider=rider)
     
-    riders = Rider.objects.filter(id__in=rider_ids)
+    # Group race results by rider and category (a rider might compete in different categories)
+    rider_totals = race_results.values('rider_id', 'category').annotate(
+        points=Sum('total_points'),
+        races_participated=Count('id'),
+        lowest_score=Min('total_points'),
+    ).order_by()
     
-    for rider in riders:
-        # Get all race results for this rider in this championship
-        race_results = RaceResult.objects.filter(
-            race__in=races,
-            rider=rider
-        )
+    championship_results = []
+    for totals in rider_totals:
+        total_points = totals['points']
+        races_participated = totals['races_participated']
         
-        if not race_results.exists():
-            continue
-        
-        # Group by category (a rider might compete in different categories)
-        categories = race_results.values_list('category', flat=True).distinct()
+        # Apply drop-lowest-score rule
+        dropped_points = Decimal(0)
+        if is_championship_completed and races_participated == total_races_in_championship:
+            # Rider participated in all races, drop lowest score
+            if races_participated > 1:  # Only drop if more than 1 race
+                total_points -= totals['lowest_score']
+                dropped_points = totals['lowest_score']
         
-        for category in categories:
-            category_results = race_results.filter(category=category)
-            races_participated = category_results.count()
-            
-            # Calculate total points
-            total_points = sum(result.total_points for result in category_results)
-            
-            # Apply drop-lowest-score rule
-            dropped_points = Decimal(0)
-            if is_championship_completed and races_participated == total_races_in_championship:
-                # Rider participated in all races, drop lowest score
-                if races_participated > 1:  # Only drop if more than 1 race
-                    points_list = [result.total_points for result in category_results]
-                    lowest_score = min(points_list)
-                    total_points -= lowest_score
-                    dropped_points = lowest_score
-            
-            ChampionshipResult.objects.update_or_create(
-                championship=championship,
-                rider=rider,
-                category=category,
-                defaults={
-                    'total_points': total_points,
-                    'races_participated': races_participated,
-                    'lowest_score_dropped': dropped_points,
-                }
-            )
+        championship_results.append(ChampionshipResult(
+            championship=championship,
+            rider_id=totals['rider_id'],
+            category=totals['category'],
+            total_points=total_points,
+            races_participated=races_participated,
+            lowest_score_dropped=dropped_points,
+        ))
     
-    return ChampionshipResult.objects.filter(championship=championship)
+    if championship_results:
+        ChampionshipResult.objects.bulk_create(
+            championship_results,
+            update_conflicts=True,
+            unique_fields=['championship', 'rider', 'category'],
+            update_fields=['total_points', 'races_participated', 'lowest_score_dropped', 'updated_at']
+        )
+    
+    # Remove standings for rider/category pairs without race results
+    current = {(result.rider_id, result.category) for result in championship_results}
+    existing = ChampionshipResult.objects.filter(championship=championship)
+    if rider is not None:
+        existing = existing.filter(rider=rider)
+    stale_ids = [
+        result_id for result_id, rider_id, category in existing.values_list('id', 'rider_id', 'category')
+        if (rider_id, category) not in current
+    ]
+    if stale_ids:
+        ChampionshipResult.objects.filter(id__in=stale_ids).delete()
+    
+    return True
 
 
+@transaction.atomic
 def calculate_club_results(championship):
     """
     Calculate club standings in a championship
     Sum of all riders' points from that club
+    
+    Club totals come from a single grouped aggregation and are written with
+    one bulk upsert; standings of clubs that no longer score are removed.
     """
-    from clubs.models import Club
-    
-    # Get all championship results
-    championship_results = ChampionshipResult.objects.filter(
-        championship=championship
-    ).select_related('rider__club')
-    
-    # Group by club
-    club_points = {}
-    for result in championship_results:
-        if result.rider.club:
-            club_id = result.rider.club.id
-            if club_id not in club_points:
-                club_points[club_id] = Decimal(0)
-            club_points[club_id] += result.total_points
-    
-    # Create or update club results
-    for club_id, total_points in club_points.items():
-        club = Club.objects.get(id=club_id)
-        ClubResult.objects.update_or_create(
+    club_totals = ChampionshipResult.objects.filter(
+        championship=championship,
+        rider__club__isnull=False
+    ).values('rider__club').annotate(
+        points=Sum('total_points')
+    ).order_by()
+    
+    club_results = [
+        ClubResult(
             championship=championship,
-            club=club,
+            club_id=totals['rider__club'],
+            total_points=totals['points']
+        )
+        for totals in club_totals
+    ]
+    
+    if club_results:
+        ClubResult.objects.bulk_create(
+            club_results,
+            update_conflicts=True,
+            unique_fields=['championship', 'club'],
+            update_fields=['total_points', 'updated_at']
+        )
+    
+    # Remove standings of clubs without scoring riders
+    ClubResult.objects.filter(championship=championship).exclude(
+        club_id__in=[result.club_id for result in club_results]
+    ).delete()
+    
+    bump_versions(championships=[championship.id])
+    
+    return ClubResult.objects.filter(championship=championship)
+
+
+def _update_club_result(championship, club_id):
+    """
+    Update a single club's standing from its riders' championship results
+    """
+    total_points = ChampionshipResult.objects.filter(
+        championship=championship,
+        rider__club_id=club_id
+    ).aggregate(total=Sum('total_points'))['total']
+    
+    if total_points is None:
+        # Club no longer has scoring riders
+        ClubResult.objects.filter(championship=championship, club_id=club_id).delete()
+        return
+    
+    ClubResult.objects.update_or_create(
+        championship=championship,
+        club_id=club_id,
+        defaults={
+            'total_points': total_points
+        }
+    )
+
+
+@transaction.atomic
+def recalculate_race_day_result(race_day, rider):
+    """
+    Incrementally recalculate the results affected by one changed race day result
+    
+    Only the rider's race result, the positions in their category, their
+    championship standings and their club's standings are updated, instead
+    of every rider in the race and in every related championship.
+    """
+    from races.models import RaceParticipation
+    
+    race = race_day.race
+    
+    # The rider may have moved category, in which case both need re-ranking
+    categories = set(
+        RaceResult.objects.filter(race=race, rider=rider).values_list('category', flat=True)
+    )
+    
+    category = RaceParticipation.objects.filter(
+        race=race,
+        rider=rider,
+        status='confirmed'
+    ).values_list('category', flat=True).first()
+    
+    totals = None
+    if category is not None:
+        day_results = list(RaceDayResult.objects.filter(
+            race_day__race=race,
+            rider=rider
+        ).values('points_earned', 'time_taken', 'penalties', 'dnf', 'dsq'))
+        
+        if day_results:
+            totals = _aggregate_race_day_results(day_results)
+    
+    if totals is not None:
+        total_points, total_time = totals
+        RaceResult.objects.update_or_create(
+            race=race,
+            rider=rider,
             defaults={
-                'total_points': total_points
+                'category': category,
+                'total_points': total_points,
+                'total_time': total_time,
+                'overall_position': 0  # Will be calculated below
             }
         )
+        categories.add(category)
+    else:
+        # Rider no longer qualifies (DNF/DSQ, unconfirmed or without results)
+        RaceResult.objects.filter(race=race, rider=rider).delete()
     
-    return ClubResult.objects.filter(championship=championship)
+    # Re-rank only the affected categories
+    if categories:
+        _assign_positions(RaceResult.objects.filter(race=race, category__in=categories))
+    
+    championships = list(race.championships.all())
+    for champ in championships:
+        _update_championship_results(champ, rider=rider)
+        if rider.club_id:
+            _update_club_result(champ, rider.club_id)
+    
+    bump_versions(races=[race.id], championships=[champ.id for champ in championships])
 
 
+@transaction.atomic
 def recalculate_all(championship=None, race=None):
     """
     Recalculate all results
@@ -233,3 +485,21 @@ def recalculate_all(championship=None, race=None):
         calculate_championship_results(championship)
         calculate_club_results(championship)
 
+
+
+@transaction.atomic
+def recalculate_races(races):
+    """
+    Recalculate several races and their related championships
+    Each race is calculated once, then each affected championship once,
+    even when championships share races
+    """
+    championships = {}
+    for race in races:
+        calculate_race_results(race)
+        for champ in race.championships.all():
+            championships[champ.id] = champ
+    
+    for champ in championships.values():
+        calculate_championship_results(champ)
+        calculate_club_results(champ)
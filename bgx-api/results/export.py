@@ -0,0 +1,221 @@
+"""
+Streaming CSV export of race results and championship/club standings
+
+Rows are read with a server-side cursor (QuerySet.iterator) and written to
+the response as they are produced, so memory use does not grow with the
+number of exported results. Per-race and per-day points are selected with
+correlated subqueries, so every export is a single query.
+
+Championship standings use the column layout of
+input_data/bgx-result-2025-full (one Race_<name> column per race). Exports
+of several categories (or championships) get a leading Category
+(Championship) column, positions restart in each of them.
+"""
+import csv
+from django.db.models import OuterRef, Subquery
+from django.http import StreamingHttpResponse
+from django.utils.text import slugify
+from .models import RaceDayResult, RaceResult, ChampionshipResult, ClubResult
+
+
+# Rows fetched per round trip of the server-side cursor
+CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """File-like object returning what is written, for csv.writer"""
+    
+    def write(self, value):
+        return value
+
+
+def streaming_csv_response(filename, header, rows):
+    """StreamingHttpResponse writing header and rows (an iterable) as CSV"""
+    writer = csv.writer(_Echo())
+    
+    def content():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+    
+    response = StreamingHttpResponse(content(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def export_filename(name, fallback):
+    return f'{slugify(name) or fallback}.csv'
+
+
+def _column_names(prefix, names):
+    """Unique column names like Race_stara_zagora"""
+    columns = []
+    for name in names:
+        column = f'{prefix}_{slugify(name, allow_unicode=True).replace("-", "_")}'
+        while column in columns:
+            column += '_'
+        columns.append(column)
+    return columns
+
+
+def _positioned(rows, group_key):
+    """Yield (position, row), numbering from 1 within each group"""
+    group = object()
+    position = 0
+    for row in rows:
+        if row[group_key] != group:
+            group = row[group_key]
+            position = 0
+        position += 1
+        yield position, row
+
+
+def _points(value):
+    return 0 if value is None else value
+
+
+def championship_standings_csv(championship, category=None):
+    """
+    Championship standings, one row per rider and category:
+    FinalPosition, RaceNumber, FirstName, LastName, TotalPoints,
+    RacesParticipated, BestPosition, WorstResultDropped, WorstRace and the
+    points of every race (0 when the rider did not score)
+    """
+    from races.models import RaceParticipation
+    
+    # Same race sequence as the championship detail and standings
+    races = list(championship.races.all())
+    race_columns = _column_names('Race', [race.name for race in races])
+    race_names = {race.id: column[len('Race_'):] for race, column in zip(races, race_columns)}
+    
+    race_results = RaceResult.objects.filter(
+        race__championships=championship,
+        rider=OuterRef('rider_id'),
+        category=OuterRef('category')
+    )
+    annotations = {
+        'race_number': Subquery(
+            RaceParticipation.objects.filter(
+                race__championships=championship,
+                rider=OuterRef('rider_id')
+            ).exclude(bib_number='').order_by('-race__start_date').values('bib_number')[:1]
+        ),
+        'best_position': Subquery(race_results.order_by('overall_position').values('overall_position')[:1]),
+        'worst_race': Subquery(race_results.order_by('total_points', 'race__start_date').values('race_id')[:1]),
+    }
+    for race in races:
+        annotations[f'race_{race.id}'] = Subquery(
+            race_results.filter(race_id=race.id).order_by().values('total_points')[:1]
+        )
+    
+    standings = ChampionshipResult.objects.filter(championship=championship)
+    if category:
+        standings = standings.filter(category=category)
+    standings = standings.annotate(**annotations).order_by(
+        'category', '-total_points', 'rider__last_name', 'rider__first_name', 'id'
+    ).values(
+        'category', 'rider__first_name', 'rider__last_name', 'total_points',
+        'races_participated', 'lowest_score_dropped', *annotations
+    )
+    
+    header = [
+        'FinalPosition', 'RaceNumber', 'FirstName', 'LastName', 'TotalPoints',
+        'RacesParticipated', 'BestPosition', 'WorstResultDropped', 'WorstRace'
+    ] + race_columns
+    if not category:
+        header = ['Category'] + header
+    
+    def rows():
+        for position, result in _positioned(standings.iterator(chunk_size=CHUNK_SIZE), 'category'):
+            dropped = result['lowest_score_dropped']
+            row = [
+                position,
+                result['race_number'] or '',
+                result['rider__first_name'],
+                result['rider__last_name'],
+                result['total_points'],
+                result['races_participated'],
+                result['best_position'] or '',
+                dropped if dropped else '',
+                race_names.get(result['worst_race'], '') if dropped else '',
+            ] + [_points(result[f'race_{race.id}']) for race in races]
+            yield [result['category']] + row if not category else row
+    
+    return header, rows()
+
+
+def race_results_csv(race, category=None):
+    """
+    Overall race results, one row per rider:
+    FinalPosition, RaceNumber, FirstName, LastName, TotalPoints, TotalTime
+    and the points of every race day (Day_<number>_<type>)
+    """
+    from races.models import RaceParticipation
+    
+    race_days = list(race.race_days.all())
+    day_columns = [f'Day_{race_day.day_number}_{race_day.type}' for race_day in race_days]
+    
+    annotations = {
+        'race_number': Subquery(
+            RaceParticipation.objects.filter(
+                race=race, rider=OuterRef('rider_id')
+            ).order_by().values('bib_number')[:1]
+        ),
+    }
+    for race_day in race_days:
+        annotations[f'day_{race_day.id}'] = Subquery(
+            RaceDayResult.objects.filter(
+                race_day_id=race_day.id, rider=OuterRef('rider_id')
+            ).order_by().values('points_earned')[:1]
+        )
+    
+    results = RaceResult.objects.filter(race=race)
+    if category:
+        results = results.filter(category=category)
+    results = results.annotate(**annotations).order_by('category', 'overall_position', 'id').values(
+        'category', 'overall_position', 'rider__first_name', 'rider__last_name',
+        'total_points', 'total_time', *annotations
+    )
+    
+    header = ['FinalPosition', 'RaceNumber', 'FirstName', 'LastName', 'TotalPoints', 'TotalTime'] + day_columns
+    if not category:
+        header = ['Category'] + header
+    
+    def rows():
+        for result in results.iterator(chunk_size=CHUNK_SIZE):
+            row = [
+                result['overall_position'],
+                result['race_number'] or '',
+                result['rider__first_name'],
+                result['rider__last_name'],
+                result['total_points'],
+                result['total_time'] or '',
+            ] + [_points(result[f'day_{race_day.id}']) for race_day in race_days]
+            yield [result['category']] + row if not category else row
+    
+    return header, rows()
+
+
+def club_standings_csv(championship_id=None):
+    """
+    Club standings: FinalPosition, Club, TotalPoints
+    (of every championship, with a leading Championship column, when no
+    championship is given)
+    """
+    standings = ClubResult.objects.all()
+    if championship_id:
+        standings = standings.filter(championship_id=championship_id)
+    standings = standings.order_by(
+        '-championship__year', 'championship__name', 'championship_id', '-total_points', 'club__name'
+    ).values('championship_id', 'championship__name', 'club__name', 'total_points')
+    
+    header = ['FinalPosition', 'Club', 'TotalPoints']
+    if not championship_id:
+        header = ['Championship'] + header
+    
+    def rows():
+        for position, result in _positioned(standings.iterator(chunk_size=CHUNK_SIZE), 'championship_id'):
+            row = [position, result['club__name'], result['total_points']]
+            yield [result['championship__name']] + row if not championship_id else row
+    
+    return header, rows()
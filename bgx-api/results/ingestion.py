@@ -0,0 +1,136 @@
+"""
+Bulk ingestion of race day results
+
+Organizers can submit raw timing data for a race day: positions are derived
+from times where they are missing and points are assigned from the
+championship's point schema, for the whole race day in one pass.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from .models import RaceDayResult
+from .calculations import get_point_table, get_points_for_positions
+from .signals import schedule_recalculation, suspend_recalculation
+
+
+# Fields of existing results overwritten only when the entries carry them
+# (e.g. a CSV without a Time column keeps the stored times)
+OPTIONAL_FIELDS = ['time_taken', 'penalties', 'notes']
+
+
+def _effective_time(entry):
+    """Time taken including time penalties (in seconds)"""
+    return entry['time_taken'] + timedelta(seconds=float(entry.get('penalties') or 0))
+
+
+def _last_entry_per_rider(entries):
+    """One entry per rider: a rider listed again replaces the earlier entry"""
+    return list({entry['rider'].pk: entry for entry in entries}.values())
+
+
+def score_race_day_results(race_day, entries):
+    """
+    Build scored race day results from raw entries
+    
+    Each entry is a dict with 'rider' and optionally 'position', 'time_taken',
+    'penalties', 'points_earned', 'dnf', 'dsq' and 'notes'.
+    
+    Positions are per category (from the rider's race participation):
+    finishers without a position are ranked by time including penalties and
+    numbered after the highest given position in their category. DNF/DSQ
+    entries and entries with neither position nor time get position 0.
+    Points are taken from the entry when given, otherwise from the race day's
+    point schema; DNF/DSQ entries score no points. When a rider is listed
+    more than once the last entry wins.
+    
+    Returns unsaved RaceDayResult instances.
+    """
+    from races.models import RaceParticipation
+    
+    entries = _last_entry_per_rider(entries)
+    
+    rider_categories = dict(
+        RaceParticipation.objects.filter(
+            race_id=race_day.race_id,
+            rider__in=[entry['rider'] for entry in entries]
+        ).values_list('rider_id', 'category')
+    )
+    
+    entries_by_category = {}
+    for entry in entries:
+        category = rider_categories.get(entry['rider'].pk)
+        entries_by_category.setdefault(category, []).append(entry)
+    
+    positions = {}
+    for category_entries in entries_by_category.values():
+        last_position = max((entry.get('position') or 0 for entry in category_entries), default=0)
+        
+        unplaced = []
+        for entry in category_entries:
+            if entry.get('dnf') or entry.get('dsq'):
+                positions[id(entry)] = entry.get('position') or 0
+            elif entry.get('position'):
+                positions[id(entry)] = entry['position']
+            elif entry.get('time_taken'):
+                unplaced.append(entry)
+            else:
+                positions[id(entry)] = 0
+        
+        unplaced.sort(key=_effective_time)
+        for position, entry in enumerate(unplaced, start=last_position + 1):
+            positions[id(entry)] = position
+    
+    # Points for every entry from a single lookup table
+    entry_positions = [positions[id(entry)] for entry in entries]
+    schema_points = get_points_for_positions(entry_positions, get_point_table(race_day))
+    
+    results = []
+    for entry, position, points in zip(entries, entry_positions, schema_points):
+        dnf = bool(entry.get('dnf'))
+        dsq = bool(entry.get('dsq'))
+        
+        if entry.get('points_earned') is not None:
+            points = entry['points_earned']
+        elif dnf or dsq:
+            points = Decimal(0)
+        
+        results.append(RaceDayResult(
+            race_day=race_day,
+            rider=entry['rider'],
+            position=position,
+            time_taken=entry.get('time_taken'),
+            points_earned=points,
+            penalties=entry.get('penalties') or 0,
+            dnf=dnf,
+            dsq=dsq,
+            notes=entry.get('notes', ''),
+        ))
+    
+    return results
+
+
+def ingest_race_day_results(race_day, entries):
+    """
+    Score raw entries and upsert them as race day results in one statement
+    The race is recalculated once afterwards (on commit)
+    
+    Existing results get new positions, points and DNF/DSQ flags; times,
+    penalties and notes only when the entries have them.
+    
+    Returns the written RaceDayResult instances.
+    """
+    results = score_race_day_results(race_day, entries)
+    update_fields = ['position', 'points_earned', 'dnf', 'dsq'] + [
+        field for field in OPTIONAL_FIELDS if any(field in entry for entry in entries)
+    ]
+    
+    with suspend_recalculation():
+        RaceDayResult.objects.bulk_create(
+            results,
+            update_conflicts=True,
+            unique_fields=['race_day', 'rider'],
+            update_fields=update_fields + ['updated_at']
+        )
+        for result in results:
+            schedule_recalculation(result)
+    
+    return results
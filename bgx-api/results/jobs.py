@@ -0,0 +1,96 @@
+"""
+Database-backed queue for result recalculations
+
+Jobs are enqueued by the API and by the result signals (when
+RESULTS_ASYNC_RECALCULATION is enabled) and processed off the request path
+by `python manage.py run_recalculation_worker`.
+Jobs left running by a crashed worker are claimed again after
+RESULTS_JOB_STALE_TIMEOUT seconds. Every claim counts an attempt and only
+the worker holding the latest one records the outcome, so a slow worker
+whose job was claimed again cannot overwrite its status.
+Finished jobs are deleted after RESULTS_JOB_RETENTION_DAYS.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import RecalculationJob
+from .calculations import recalculate_all
+
+
+def enqueue_recalculation(race=None, championship=None):
+    """
+    Queue a recalculation of a race or championship
+    Returns the existing pending job for the same target if there is one
+    """
+    if race is not None:
+        job, created = RecalculationJob.objects.get_or_create(race=race, status='pending')
+    elif championship is not None:
+        job, created = RecalculationJob.objects.get_or_create(championship=championship, status='pending')
+    else:
+        raise ValueError('Either race or championship is required')
+    return job
+
+
+def claim_next_job():
+    """
+    Claim the oldest pending (or stale running) job and mark it as running
+    Concurrent workers skip jobs already locked by another worker
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.RESULTS_JOB_STALE_TIMEOUT)
+    
+    with transaction.atomic():
+        job = RecalculationJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status='pending') | Q(status='running', started_at__lt=stale_before)
+        ).order_by('created_at').first()
+        
+        if job is None:
+            return None
+        
+        job.status = 'running'
+        job.started_at = now
+        job.attempts += 1
+        job.save(update_fields=['status', 'started_at', 'attempts'])
+    return job
+
+
+def run_job(job):
+    """
+    Run a claimed job and record its outcome
+    Returns None when the job was claimed again by another worker in the
+    meantime (its outcome is then left to that worker)
+    """
+    try:
+        with transaction.atomic():
+            recalculate_all(championship=job.championship, race=job.race)
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+    else:
+        job.status = 'completed'
+    job.finished_at = timezone.now()
+    
+    updated = RecalculationJob.objects.filter(
+        pk=job.pk, status='running', attempts=job.attempts
+    ).update(status=job.status, error=job.error, finished_at=job.finished_at)
+    return job if updated else None
+
+
+def prune_finished_jobs(retention_days=None):
+    """
+    Delete completed and failed jobs finished more than retention_days
+    (default RESULTS_JOB_RETENTION_DAYS, 0 keeps them) ago
+    Returns the number of deleted jobs
+    """
+    if retention_days is None:
+        retention_days = settings.RESULTS_JOB_RETENTION_DAYS
+    if not retention_days:
+        return 0
+    
+    finished_before = timezone.now() - timedelta(days=retention_days)
+    deleted, _ = RecalculationJob.objects.filter(
+        status__in=['completed', 'failed'], finished_at__lt=finished_before
+    ).delete()
+    return deleted
@@ -0,0 +1,432 @@
+"""
+Django management command to benchmark result calculations, importers and API endpoints
+
+A synthetic season is generated in a separate test database (SQLite or
+PostgreSQL, whichever is configured), so the real data is never touched.
+The timings are printed as JSON, to compare commits and catch scaling
+regressions.
+
+Usage:
+    # Default season size
+    python manage.py benchmark
+    
+    # Larger season, 5 repeats, written to a file
+    python manage.py benchmark --riders 1000 --races 12 --participants 40 --repeat 5 --output bench.json
+    
+    # Only calculations
+    python manage.py benchmark --skip-imports --skip-endpoints
+    
+    # Also EXPLAIN the hot result queries with and without the query pattern indexes
+    python manage.py benchmark --explain --skip-imports --skip-endpoints
+"""
+import csv
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from io import StringIO
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Min, Sum
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+from results.calculations import (
+    calculate_race_results,
+    calculate_championship_results,
+    calculate_club_results,
+    recalculate_races
+)
+from results.synthetic import generate_season
+
+
+# Indexes designed from the hot result queries, dropped for the "before" plans
+QUERY_PATTERN_INDEXES = {
+    'results.RaceDayResult': ['racedayresult_totals_idx'],
+    'results.RaceResult': ['raceresult_ranking_idx'],
+    'results.ChampionshipResult': ['champresult_standings_idx'],
+    'races.RaceParticipation': ['participation_confirmed_idx', 'participation_rider_conf_idx'],
+}
+
+
+def _timings(durations):
+    """Summary of a list of durations (seconds) in milliseconds"""
+    return {
+        'min_ms': round(min(durations) * 1000, 2),
+        'median_ms': round(statistics.median(durations) * 1000, 2),
+        'mean_ms': round(statistics.mean(durations) * 1000, 2),
+    }
+
+
+def _explain(queryset, options, label):
+    """
+    EXPLAIN output lines of queryset (like QuerySet.explain)
+    
+    The SQL carries a comment with label: SQLite caches prepared statements
+    by their text and would otherwise report the plan compiled before the
+    indexes were dropped.
+    """
+    sql, params = queryset.query.sql_with_params()
+    prefix = connection.ops.explain_query_prefix(**options)
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql} /* {label} */', params)
+        return [row if isinstance(row, str) else ' '.join(str(column) for column in row)
+                for row in cursor.fetchall()]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark result calculations, importers and API endpoints on a synthetic season'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clubs', type=int, default=10, help='Number of clubs (default: 10)')
+        parser.add_argument('--riders', type=int, default=200, help='Number of riders (default: 200)')
+        parser.add_argument('--championships', type=int, default=2, help='Number of championships (default: 2)')
+        parser.add_argument('--races', type=int, default=6, help='Number of races (default: 6)')
+        parser.add_argument('--days', type=int, default=3, help='Race days per race (default: 3)')
+        parser.add_argument(
+            '--participants',
+            type=int,
+            default=15,
+            help='Participants per category in each race (default: 15)'
+        )
+        parser.add_argument('--categories', type=int, default=4, help='Categories per race (default: 4)')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+        parser.add_argument('--repeat', type=int, default=3, help='Repetitions per measurement (default: 3)')
+        parser.add_argument('--skip-imports', action='store_true', help='Do not benchmark the import commands')
+        parser.add_argument('--skip-endpoints', action='store_true', help='Do not benchmark the API endpoints')
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Report EXPLAIN plans of the hot result queries with and without the query pattern indexes'
+        )
+        parser.add_argument('--output', type=str, help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        self.repeat = max(1, options['repeat'])
+        sizes = {
+            key: options[key]
+            for key in ['clubs', 'riders', 'championships', 'races', 'days', 'participants', 'categories']
+        }
+        
+        # Work in a throwaway test database next to the configured one
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(RESULTS_ASYNC_RECALCULATION=False):
+                report = self.run_benchmarks(sizes, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Benchmark written to {options["output"]}'))
+        else:
+            self.stdout.write(output)
+
+    def run_benchmarks(self, sizes, options):
+        from championships.models import Championship
+        from races.models import Race
+        
+        started = time.perf_counter()
+        created = generate_season(seed=options['seed'], **sizes)
+        generate_time = time.perf_counter() - started
+        
+        races = list(Race.objects.order_by('id'))
+        championships = list(Championship.objects.order_by('id'))
+        
+        report = {
+            'commit': _git_commit(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sizes': sizes,
+            'created': created,
+            'generate_ms': round(generate_time * 1000, 2),
+            'repeat': self.repeat,
+            'calculations': {},
+        }
+        
+        calculations = report['calculations']
+        calculations['calculate_race_results'] = self.measure(
+            lambda: [calculate_race_results(race) for race in races], per_call=len(races)
+        )
+        calculations['calculate_championship_results'] = self.measure(
+            lambda: [calculate_championship_results(championship) for championship in championships],
+            per_call=len(championships)
+        )
+        calculations['calculate_club_results'] = self.measure(
+            lambda: [calculate_club_results(championship) for championship in championships],
+            per_call=len(championships)
+        )
+        calculations['recalculate_races'] = self.measure(lambda: recalculate_races(races))
+        
+        if not options['skip_endpoints']:
+            # Response cache off, otherwise repetitions after the first are cache hits
+            with override_settings(RESULTS_CACHE_ENABLED=False):
+                report['endpoints'] = self.benchmark_endpoints(races, championships)
+        
+        if not options['skip_imports']:
+            report['imports'] = self.benchmark_imports(races)
+        
+        # Last: indexes are dropped (in a transaction that is rolled back)
+        if options['explain']:
+            report['explain'] = self.explain_queries(races, championships)
+        
+        return report
+
+    def measure(self, func, per_call=None):
+        """Run func `repeat` times and summarize the durations"""
+        durations = []
+        queries = []
+        for _ in range(self.repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                func()
+                durations.append(time.perf_counter() - started)
+            queries.append(len(captured))
+        
+        result = _timings(durations)
+        # Per repetition, so a count that changes between runs (e.g. caching) shows
+        result['queries'] = queries
+        if per_call:
+            result['calls'] = per_call
+            result['per_call_ms'] = round(min(durations) * 1000 / per_call, 2)
+        return result
+
+    def benchmark_endpoints(self, races, championships):
+        """Time the main list and detail endpoints through the test client"""
+        from clubs.models import Club
+        from riders.models import Rider
+        from results.models import RaceDayResult
+        from django.contrib.auth import get_user_model
+        
+        # Some detail actions (e.g. standings) need an authenticated user
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create(username='benchmark_user'))
+        race = races[0] if races else None
+        championship = championships[0] if championships else None
+        club = Club.objects.order_by('id').first()
+        rider = Rider.objects.order_by('id').first()
+        race_day_result = RaceDayResult.objects.order_by('id').first()
+        
+        urls = {
+            'race-list': '/api/races/',
+            'championship-list': '/api/championships/',
+            'club-list': '/api/clubs/',
+            'rider-list': '/api/riders/',
+            'racedayresult-list': '/api/results/race-day-results/',
+            'raceresult-list': '/api/results/race-results/',
+            'championshipresult-list': '/api/results/championship-results/',
+            'clubresult-list': '/api/results/club-standings/',
+        }
+        if race:
+            urls['race-detail'] = f'/api/races/{race.id}/'
+            urls['race-results'] = f'/api/results/race-results/?race={race.id}'
+        if championship:
+            urls['championship-detail'] = f'/api/championships/{championship.id}/'
+            urls['championship-standings'] = f'/api/championships/{championship.id}/standings/'
+            urls['championship-results'] = f'/api/results/championship-results/?championship={championship.id}'
+            urls['club-standings'] = f'/api/results/club-standings/?championship={championship.id}'
+        if club:
+            urls['club-detail'] = f'/api/clubs/{club.id}/'
+        if rider:
+            urls['rider-detail'] = f'/api/riders/{rider.id}/'
+        if race_day_result:
+            urls['racedayresult-detail'] = f'/api/results/race-day-results/{race_day_result.id}/'
+        
+        endpoints = {}
+        for name, url in urls.items():
+            statuses = set()
+
+            def get():
+                response = client.get(url, HTTP_ACCEPT='application/json')
+                statuses.add(response.status_code)
+            
+            endpoints[name] = self.measure(get)
+            endpoints[name]['url'] = url
+            endpoints[name]['status'] = sorted(statuses)
+        return endpoints
+
+    def benchmark_imports(self, races):
+        """Time the CSV import commands on files written from the synthetic season"""
+        from races.models import RaceDay, RaceParticipation
+        from results.models import RaceDayResult
+        
+        imports = {}
+        race_day = RaceDay.objects.filter(race__in=races).order_by('id').first()
+        if not race_day:
+            return imports
+        
+        participations = {
+            participation.rider_id: participation
+            for participation in RaceParticipation.objects.filter(race_id=race_day.race_id)
+        }
+        day_results = list(
+            RaceDayResult.objects.filter(race_day=race_day).select_related('rider__user').order_by('id')
+        )
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # import_race_results: one race day, riders matched by bib number
+            race_results_file = os.path.join(tmp_dir, 'race_results.csv')
+            with open(race_results_file, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['RaceNumber', 'FirstName', 'LastName', 'Position', 'Points'])
+                for result in day_results:
+                    writer.writerow([
+                        participations[result.rider_id].bib_number, result.rider.first_name,
+                        result.rider.last_name, result.position, result.points_earned
+                    ])
+            
+            imports['import_race_results'] = self.measure(lambda: call_command(
+                'import_race_results', race_day_id=race_day.id, file=race_results_file, stdout=StringIO()
+            ))
+            imports['import_race_results']['rows'] = len(day_results)
+            
+            # import_results_from_directories: race_day-X/<category>.csv, riders matched by license
+            base_dir = os.path.join(tmp_dir, 'results-by-race-day')
+            day_dir = os.path.join(base_dir, f'race_day-{race_day.id}')
+            os.makedirs(day_dir)
+            by_category = {}
+            for result in day_results:
+                by_category.setdefault(participations[result.rider_id].category, []).append(result)
+            for category, category_results in by_category.items():
+                with open(os.path.join(day_dir, f'{category}.csv'), 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(['RaceNumber', 'FirstName', 'LastName', 'Position', 'Points'])
+                    for result in category_results:
+                        writer.writerow([
+                            result.rider.license_number, result.rider.first_name,
+                            result.rider.last_name, result.position, result.points_earned
+                        ])
+            
+            imports['import_results_from_directories'] = self.measure(lambda: call_command(
+                'import_results_from_directories', base_dir=base_dir, stdout=StringIO()
+            ))
+            imports['import_results_from_directories']['rows'] = len(day_results)
+            
+            imports['import_results_from_directories_fast'] = self.measure(lambda: call_command(
+                'import_results_from_directories', base_dir=base_dir, fast=True, stdout=StringIO()
+            ))
+            imports['import_results_from_directories_fast']['rows'] = len(day_results)
+            
+            # import_race_day_results: riders matched by username, one column per race day
+            race_day_file = os.path.join(tmp_dir, 'race_day_results.csv')
+            with open(race_day_file, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['N', 'username', f'race_day-{race_day.id}'])
+                for result in day_results:
+                    writer.writerow([result.position, result.rider.user.username, result.points_earned])
+            
+            imports['import_race_day_results'] = self.measure(lambda: call_command(
+                'import_race_day_results', file=race_day_file, stdout=StringIO()
+            ))
+            imports['import_race_day_results']['rows'] = len(day_results)
+        
+        return imports
+
+    def explain_queries(self, races, championships):
+        """
+        EXPLAIN the hot result queries with the query pattern indexes, then
+        drop the indexes and EXPLAIN them again
+        
+        The indexes are dropped inside a transaction that is rolled back, so
+        they are never missing outside of it (DDL is transactional on
+        PostgreSQL and SQLite). On PostgreSQL the plans are EXPLAIN ANALYZE output with actual timings
+        (index only scans need the included columns, which SQLite ignores).
+        """
+        from django.apps import apps
+        from races.models import RaceDay, RaceParticipation
+        from results.models import RaceDayResult, RaceResult, ChampionshipResult
+        
+        race = races[0] if races else None
+        championship = championships[0] if championships else None
+        if race is None or championship is None:
+            return {}
+        
+        participation = RaceParticipation.objects.filter(race=race, status='confirmed').order_by('id').first()
+        rider_ids = list(
+            RaceParticipation.objects.filter(race=race, status='confirmed').values_list('rider_id', flat=True)
+        )
+        championship_races = championship.races.all()
+        
+        queries = {
+            'confirmed_participants': RaceParticipation.objects.filter(
+                race=race, status='confirmed'
+            ).values_list('rider_id', 'category'),
+            'rider_confirmed_participations': RaceParticipation.objects.filter(
+                rider_id=participation.rider_id, status='confirmed'
+            ).values('pk'),
+            'race_day_results_of_race': RaceDayResult.objects.filter(
+                race_day__race=race, rider_id__in=rider_ids
+            ).values('rider_id', 'points_earned', 'time_taken', 'penalties', 'dnf', 'dsq'),
+            'race_day_results_of_rider': RaceDayResult.objects.filter(
+                race_day__race=race, rider_id=participation.rider_id
+            ).values('points_earned', 'time_taken', 'penalties', 'dnf', 'dsq'),
+            'race_category_ranking': RaceResult.objects.filter(
+                race=race, category=participation.category
+            ).order_by('-total_points', 'total_time').values('id', 'rider_id'),
+            'championship_race_totals': RaceResult.objects.filter(
+                race__in=championship_races
+            ).values('rider_id', 'category').annotate(
+                points=Sum('total_points'), races_participated=Count('id'), lowest_score=Min('total_points')
+            ).order_by(),
+            'championship_standings': ChampionshipResult.objects.filter(
+                championship=championship
+            ).order_by('-total_points')[:50],
+        }
+        
+        options = {}
+        if connection.vendor == 'postgresql':
+            options = {'analyze': True, 'buffers': True}
+            # Fresh planner statistics for the synthetic data
+            with connection.cursor() as cursor:
+                for model in (RaceDay, RaceParticipation, RaceDayResult, RaceResult, ChampionshipResult):
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+        
+        plans = {name: {'sql': str(queryset.query)} for name, queryset in queries.items()}
+        for name, queryset in queries.items():
+            plans[name]['with_indexes'] = _explain(queryset, options, 'with indexes')
+        
+        dropped = []
+        with connection.cursor() as cursor:
+            for label, index_names in QUERY_PATTERN_INDEXES.items():
+                model = apps.get_model(label)
+                existing = connection.introspection.get_constraints(cursor, model._meta.db_table)
+                dropped += [
+                    (model, index) for index in model._meta.indexes
+                    if index.name in index_names and index.name in existing
+                ]
+        
+        # DROP INDEX statements run directly: the SQLite schema editor cannot
+        # be used inside a transaction
+        editor = connection.schema_editor()
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for model, index in dropped:
+                    cursor.execute(str(index.remove_sql(model, editor)))
+            for name, queryset in queries.items():
+                plans[name]['without_indexes'] = _explain(queryset, options, 'without indexes')
+            transaction.set_rollback(True)
+        
+        return {
+            'dropped_indexes': [index.name for _, index in dropped],
+            'plans': plans,
+        }
@@ -2,16 +2,12 @@ import csv
 import os
 import re
 from django.core.management.base import BaseCommand
-from django.contrib.auth import get_user_model
-from django.db import transaction
 from results.models import RaceDayResult
-from riders.models import Rider
+from results.signals import atomic_recalculation, suspend_recalculation
+from riders.index import RiderIndex
 from races.models import RaceDay
 
 
-User = get_user_model()
-
-
 class Command(BaseCommand):
     help = 'Import race day results from CSV file'
 
@@ -74,7 +70,11 @@ class Command(BaseCommand):
         rider_not_found = []
         race_day_not_found = []
         
-        with open(file_path, 'r', encoding='utf-8') as f:
+        # All riders in one query, rows are matched by username in memory
+        rider_index = RiderIndex.load()
+        
+        # Recalculate each affected race once at the end instead of per row
+        with suspend_recalculation(), open(file_path, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
             
             # Find all race_day columns
@@ -103,18 +103,10 @@ class Command(BaseCommand):
                     position = 0
                 
                 # Find rider by username
-                try:
-                    user = User.objects.get(username=username)
-                    rider = user.rider_profile
-                except User.DoesNotExist:
-                    if username not in rider_not_found:
-                        self.stdout.write(self.style.WARNING(f'User not found: {username}'))
-                        rider_not_found.append(username)
-                    skipped_count += 1
-                    continue
-                except Rider.DoesNotExist:
+                rider = rider_index.get_by_username(username)
+                if rider is None:
                     if username not in rider_not_found:
-                        self.stdout.write(self.style.WARNING(f'Rider profile not found for user: {username}'))
+                        self.stdout.write(self.style.WARNING(f'Rider not found for user: {username}'))
                         rider_not_found.append(username)
                     skipped_count += 1
                     continue
@@ -159,7 +151,7 @@ class Command(BaseCommand):
                         created_count += 1
                     else:
                         try:
-                            with transaction.atomic():
+                            with atomic_recalculation():
                                 # Create or update race day result
                                 result, created = RaceDayResult.objects.update_or_create(
                                     race_day=race_day,
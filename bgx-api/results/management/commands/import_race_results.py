@@ -1,15 +1,18 @@
 """
 Management command to import race results from CSV files
+
+Columns: RaceNumber, FirstName, LastName, Position, Points and optionally
+Time (HH:MM:SS), Penalties (seconds), DNF, DSQ. Missing positions are
+derived from times and missing points from the championship's point schema.
 """
 import csv
-from datetime import timedelta
 from decimal import Decimal
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.utils.dateparse import parse_duration
 from races.models import Race, RaceDay
-from riders.models import Rider
-from results.models import RaceDayResult
-from results.calculations import recalculate_all
+from riders.index import RiderIndex
+from results.ingestion import ingest_race_day_results, score_race_day_results
 
 
 class Command(BaseCommand):
@@ -58,6 +61,14 @@ class Command(BaseCommand):
         if dry_run:
             self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be saved'))
 
+        # Confirmed participants by bib number, and all riders for name matching
+        riders_by_bib = {}
+        for participation in race_day.race.participations.filter(
+            status='confirmed'
+        ).select_related('rider').order_by('id'):
+            riders_by_bib.setdefault(participation.bib_number, participation.rider)
+        rider_index = RiderIndex.load() if match_by_name else None
+
         # Read CSV file
         try:
             with open(file_path, 'r', encoding='utf-8') as csvfile:
@@ -66,34 +77,31 @@ class Command(BaseCommand):
                 imported = 0
                 skipped = 0
                 errors = []
+                entries = []
 
                 for row in reader:
                     try:
                         race_number = row.get('RaceNumber', '').strip()
                         first_name = row.get('FirstName', '').strip()
                         last_name = row.get('LastName', '').strip()
-                        position = int(row.get('Position', 0))
-                        points = Decimal(row.get('Points', 0))
+                        position_str = (row.get('Position') or '').strip()
+                        points_str = (row.get('Points') or '').strip()
+                        time_str = (row.get('Time') or '').strip()
+                        penalties_str = (row.get('Penalties') or '').strip()
+
+                        position = int(position_str) if position_str else None
+                        points = Decimal(points_str) if points_str else None
+                        time_taken = parse_duration(time_str) if time_str else None
+                        if time_str and time_taken is None:
+                            raise ValueError(f'Invalid time: {time_str}')
 
                         # Try to find rider by bib number first
-                        rider = None
-                        
-                        if race_number:
-                            # Find rider through race participation
-                            participation = race_day.race.participations.filter(
-                                bib_number=race_number,
-                                status='confirmed'
-                            ).first()
-                            
-                            if participation:
-                                rider = participation.rider
+                        rider = riders_by_bib.get(race_number) if race_number else None
 
                         # If not found and match_by_name is enabled, try to match by name
+                        # (names shared by several riders are reported, not guessed)
                         if not rider and match_by_name and first_name and last_name:
-                            rider = Rider.objects.filter(
-                                first_name__iexact=first_name,
-                                last_name__iexact=last_name
-                            ).first()
+                            rider = rider_index.get_by_name(first_name, last_name)
 
                         if not rider:
                             errors.append(
@@ -103,27 +111,19 @@ class Command(BaseCommand):
                             skipped += 1
                             continue
 
-                        # Create or update result
-                        if not dry_run:
-                            result, created = RaceDayResult.objects.update_or_create(
-                                race_day=race_day,
-                                rider=rider,
-                                defaults={
-                                    'position': position,
-                                    'points_earned': points,
-                                    'dnf': False,
-                                    'dsq': False,
-                                }
-                            )
-                            
-                            action = 'Created' if created else 'Updated'
-                            self.stdout.write(
-                                f'{action} result: {rider.full_name} - P{position} ({points} pts)'
-                            )
-                        else:
-                            self.stdout.write(
-                                f'Would create/update: {rider.full_name} - P{position} ({points} pts)'
-                            )
+                        entry = {
+                            'rider': rider,
+                            'position': position,
+                            'points_earned': points,
+                            'dnf': (row.get('DNF') or '').strip().lower() in ('1', 'true', 'yes', 'x'),
+                            'dsq': (row.get('DSQ') or '').strip().lower() in ('1', 'true', 'yes', 'x'),
+                        }
+                        # Stored times and penalties are kept when the file has no such column
+                        if 'Time' in reader.fieldnames:
+                            entry['time_taken'] = time_taken
+                        if 'Penalties' in reader.fieldnames:
+                            entry['penalties'] = Decimal(penalties_str) if penalties_str else 0
+                        entries.append(entry)
 
                         imported += 1
 
@@ -136,6 +136,19 @@ class Command(BaseCommand):
         except Exception as e:
             raise CommandError(f'Error reading file: {str(e)}')
 
+        # Score and store all results in one pass; the race is recalculated once on commit
+        if entries:
+            if not dry_run:
+                results = ingest_race_day_results(race_day, entries)
+            else:
+                results = score_race_day_results(race_day, entries)
+
+            prefix = 'Would create/update' if dry_run else 'Imported result'
+            for result in results:
+                self.stdout.write(
+                    f'{prefix}: {result.rider.full_name} - P{result.position} ({result.points_earned} pts)'
+                )
+
         # Print summary
         self.stdout.write('\n' + '='*50)
         self.stdout.write(self.style.SUCCESS(f'Imported: {imported}'))
@@ -146,11 +159,14 @@ class Command(BaseCommand):
             for error in errors:
                 self.stdout.write(self.style.ERROR(f'  - {error}'))
 
-        # Recalculate results
+        if rider_index and rider_index.ambiguous:
+            self.stdout.write('\n' + self.style.WARNING('Ambiguous riders (skipped):'))
+            for line in rider_index.ambiguous_report():
+                self.stdout.write(self.style.WARNING(f'  - {line}'))
+
+        # Results are recalculated once when the import transaction commits
         if not dry_run and imported > 0:
-            self.stdout.write('\nRecalculating race and championship results...')
-            recalculate_all(race=race_day.race)
-            self.stdout.write(self.style.SUCCESS('Recalculation complete!'))
+            self.stdout.write('\nRace and championship results will be recalculated on commit')
 
         if dry_run:
             self.stdout.write('\n' + self.style.WARNING('DRY RUN COMPLETE - No changes were saved'))
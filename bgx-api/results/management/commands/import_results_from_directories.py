@@ -1,10 +1,12 @@
 import csv
+import io
 import os
 import re
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import connection
 from results.models import RaceDayResult
-from riders.models import Rider
+from results.signals import atomic_recalculation, schedule_recalculation, suspend_recalculation
+from riders.index import RiderIndex
 from races.models import RaceDay, RaceParticipation
 
 
@@ -23,10 +25,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Run without actually creating results in the database'
         )
-
-    def normalize_name(self, name):
-        """Normalize name for comparison (lowercase, strip)"""
-        return name.strip().lower()
+        parser.add_argument(
+            '--fast',
+            action='store_true',
+            help='Read all files first, resolve riders in one query and write everything in one '
+                 'transaction (COPY into a temp table and INSERT ... ON CONFLICT on PostgreSQL)'
+        )
     
     def map_category(self, filename):
         """
@@ -58,41 +62,20 @@ class Command(BaseCommand):
 
     def find_rider(self, first_name, last_name, license_number):
         """
-        Find rider by matching first name, last name, and license number.
-        Returns the rider or None if not found.
+        Find rider by matching first name, last name, and license number
+        (by name only when the license number differs).
+        Returns the rider or None if not found or ambiguous.
         """
-        # Normalize names for comparison
-        first_normalized = self.normalize_name(first_name)
-        last_normalized = self.normalize_name(last_name)
-        license_str = str(license_number).strip()
-        
-        # Try to find rider with matching license number
-        riders = Rider.objects.filter(license_number=license_str)
-        
-        for rider in riders:
-            rider_first = self.normalize_name(rider.first_name)
-            rider_last = self.normalize_name(rider.last_name)
-            
-            # Check if names match
-            if rider_first == first_normalized and rider_last == last_normalized:
-                return rider
+        rider, matched_by = self.rider_index.match(first_name, last_name, license_number)
         
-        # If not found by license, try by name only (in case license number differs)
-        riders_by_name = Rider.objects.filter(
-            first_name__iexact=first_name,
-            last_name__iexact=last_name
-        )
-        
-        if riders_by_name.count() == 1:
-            rider = riders_by_name.first()
+        if matched_by == 'name':
             self.stdout.write(
                 self.style.WARNING(
-                    f'Found rider by name only: {rider.full_name} (license mismatch: CSV={license_str}, DB={rider.license_number})'
+                    f'Found rider by name only: {rider.full_name} (license mismatch: CSV={str(license_number).strip()}, DB={rider.license_number})'
                 )
             )
-            return rider
         
-        return None
+        return rider
 
     def handle(self, *args, **options):
         base_dir_path = options['base_dir']
@@ -150,171 +133,179 @@ class Command(BaseCommand):
         
         self.stdout.write(self.style.SUCCESS(f'Found {len(race_day_dirs)} race day directories'))
         
-        # Process each race day directory
-        for race_day_dir in race_day_dirs:
-            # Extract race day ID
-            match = re.search(r'race_day-(\d+)', race_day_dir)
-            if not match:
-                continue
-            
-            race_day_id = match.group(1)
-            race_day_path = os.path.join(base_dir, race_day_dir)
-            
-            # Find race day in database
-            try:
-                race_day = RaceDay.objects.get(id=race_day_id)
-            except RaceDay.DoesNotExist:
-                self.stdout.write(
-                    self.style.WARNING(f'Race day not found in database: ID {race_day_id} - Skipping directory')
-                )
-                continue
-            
-            self.stdout.write(self.style.SUCCESS(f'\n{"=" * 70}'))
-            self.stdout.write(self.style.SUCCESS(f'Processing: {race_day_dir} -> {race_day}'))
-            self.stdout.write(self.style.SUCCESS(f'{"=" * 70}'))
-            
-            race_days_processed += 1
-            
-            # Find all CSV files in this directory
-            try:
-                csv_files = [f for f in os.listdir(race_day_path) if f.endswith('.csv')]
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'Error reading directory {race_day_path}: {str(e)}'))
-                continue
-            
-            if not csv_files:
-                self.stdout.write(self.style.WARNING(f'No CSV files found in {race_day_dir}'))
-                continue
-            
-            # Get the race from the race day
-            race = race_day.race
-            
-            # Process each CSV file
-            for csv_file in sorted(csv_files):
-                csv_path = os.path.join(race_day_path, csv_file)
-                category = self.map_category(csv_file)
+        # All riders in one query, every row is matched in memory
+        self.rider_index = RiderIndex.load()
+        
+        if options['fast']:
+            return self.handle_fast(base_dir, race_day_dirs, dry_run)
+        
+        # Recalculate each affected race once at the end instead of per row
+        with suspend_recalculation():
+            # Process each race day directory
+            for race_day_dir in race_day_dirs:
+                # Extract race day ID
+                match = re.search(r'race_day-(\d+)', race_day_dir)
+                if not match:
+                    continue
                 
-                self.stdout.write(f'\n  Reading: {csv_file} (category: {category})')
+                race_day_id = match.group(1)
+                race_day_path = os.path.join(base_dir, race_day_dir)
                 
-                files_processed += 1
-                file_created = 0
-                file_updated = 0
-                file_skipped = 0
-                file_errors = 0
+                # Find race day in database
+                try:
+                    race_day = RaceDay.objects.get(id=race_day_id)
+                except RaceDay.DoesNotExist:
+                    self.stdout.write(
+                        self.style.WARNING(f'Race day not found in database: ID {race_day_id} - Skipping directory')
+                    )
+                    continue
+                
+                self.stdout.write(self.style.SUCCESS(f'\n{"=" * 70}'))
+                self.stdout.write(self.style.SUCCESS(f'Processing: {race_day_dir} -> {race_day}'))
+                self.stdout.write(self.style.SUCCESS(f'{"=" * 70}'))
                 
+                race_days_processed += 1
+                
+                # Find all CSV files in this directory
                 try:
-                    with open(csv_path, 'r', encoding='utf-8') as f:
-                        reader = csv.DictReader(f)
-                        
-                        for row in reader:
-                            race_number = row.get('RaceNumber', '').strip()
-                            first_name = row.get('FirstName', '').strip()
-                            last_name = row.get('LastName', '').strip()
-                            position_str = row.get('Position', '').strip()
-                            points_str = row.get('Points', '').strip()
-                            
-                            if not race_number or not first_name or not last_name:
-                                self.stdout.write(
-                                    self.style.WARNING(f'    Skipping incomplete row: {row}')
-                                )
-                                file_skipped += 1
-                                continue
-                            
-                            # Convert position and points
-                            try:
-                                position = int(position_str) if position_str else 0
-                            except ValueError:
-                                self.stdout.write(
-                                    self.style.WARNING(f'    Invalid position for {first_name} {last_name}: {position_str}')
-                                )
-                                position = 0
-                            
-                            try:
-                                points = float(points_str) if points_str else 0.0
-                            except ValueError:
-                                self.stdout.write(
-                                    self.style.WARNING(f'    Invalid points for {first_name} {last_name}: {points_str}')
-                                )
-                                points = 0.0
-                            
-                            # Find rider
-                            rider = self.find_rider(first_name, last_name, race_number)
+                    csv_files = [f for f in os.listdir(race_day_path) if f.endswith('.csv')]
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f'Error reading directory {race_day_path}: {str(e)}'))
+                    continue
+                
+                if not csv_files:
+                    self.stdout.write(self.style.WARNING(f'No CSV files found in {race_day_dir}'))
+                    continue
+                
+                # Get the race from the race day
+                race = race_day.race
+                
+                # Process each CSV file
+                for csv_file in sorted(csv_files):
+                    csv_path = os.path.join(race_day_path, csv_file)
+                    category = self.map_category(csv_file)
+                    
+                    self.stdout.write(f'\n  Reading: {csv_file} (category: {category})')
+                    
+                    files_processed += 1
+                    file_created = 0
+                    file_updated = 0
+                    file_skipped = 0
+                    file_errors = 0
+                    
+                    try:
+                        with open(csv_path, 'r', encoding='utf-8') as f:
+                            reader = csv.DictReader(f)
                             
-                            if not rider:
-                                self.stdout.write(
-                                    self.style.WARNING(
-                                        f'    Rider not found: {first_name} {last_name} (License: {race_number})'
+                            for row in reader:
+                                race_number = row.get('RaceNumber', '').strip()
+                                first_name = row.get('FirstName', '').strip()
+                                last_name = row.get('LastName', '').strip()
+                                position_str = row.get('Position', '').strip()
+                                points_str = row.get('Points', '').strip()
+                                
+                                if not race_number or not first_name or not last_name:
+                                    self.stdout.write(
+                                        self.style.WARNING(f'    Skipping incomplete row: {row}')
                                     )
-                                )
-                                file_skipped += 1
-                                continue
-                            
-                            if dry_run:
-                                self.stdout.write(
-                                    f'    Would create: {rider.full_name} - P{position} - {points} pts + participation'
-                                )
-                                file_created += 1
-                            else:
+                                    file_skipped += 1
+                                    continue
+                                
+                                # Convert position and points
                                 try:
-                                    with transaction.atomic():
-                                        # Create race participation
-                                        participation, part_created = RaceParticipation.objects.update_or_create(
-                                            race=race,
-                                            rider=rider,
-                                            defaults={
-                                                'category': category,
-                                                'status': 'confirmed',
-                                                'bib_number': race_number,
-                                            }
-                                        )
-                                        
-                                        if part_created:
-                                            total_participations_created += 1
-                                        else:
-                                            total_participations_updated += 1
-                                        
-                                        # Create race day result
-                                        result, created = RaceDayResult.objects.update_or_create(
-                                            race_day=race_day,
-                                            rider=rider,
-                                            defaults={
-                                                'position': position,
-                                                'points_earned': points,
-                                            }
-                                        )
-                                        
-                                        if created:
-                                            file_created += 1
-                                            action = '✓ Created'
-                                        else:
-                                            file_updated += 1
-                                            action = '↻ Updated'
-                                        
-                                        part_status = '(new)' if part_created else '(exists)'
-                                        self.stdout.write(
-                                            f'    {action}: {rider.full_name} - P{position} - {points} pts - {category} {part_status}'
-                                        )
-                                        
-                                except Exception as e:
+                                    position = int(position_str) if position_str else 0
+                                except ValueError:
                                     self.stdout.write(
-                                        self.style.ERROR(
-                                            f'    Error creating result for {first_name} {last_name}: {str(e)}'
+                                        self.style.WARNING(f'    Invalid position for {first_name} {last_name}: {position_str}')
+                                    )
+                                    position = 0
+                                
+                                try:
+                                    points = float(points_str) if points_str else 0.0
+                                except ValueError:
+                                    self.stdout.write(
+                                        self.style.WARNING(f'    Invalid points for {first_name} {last_name}: {points_str}')
+                                    )
+                                    points = 0.0
+                                
+                                # Find rider
+                                rider = self.find_rider(first_name, last_name, race_number)
+                                
+                                if not rider:
+                                    self.stdout.write(
+                                        self.style.WARNING(
+                                            f'    Rider not found: {first_name} {last_name} (License: {race_number})'
                                         )
                                     )
-                                    file_errors += 1
-                    
-                    # File summary
-                    self.stdout.write(f'  {csv_file}: Created={file_created}, Updated={file_updated}, Skipped={file_skipped}, Errors={file_errors}')
-                    
-                    total_created += file_created
-                    total_updated += file_updated
-                    total_skipped += file_skipped
-                    total_errors += file_errors
-                    
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f'  Error reading {csv_file}: {str(e)}'))
-                    total_errors += 1
-        
+                                    file_skipped += 1
+                                    continue
+                                
+                                if dry_run:
+                                    self.stdout.write(
+                                        f'    Would create: {rider.full_name} - P{position} - {points} pts + participation'
+                                    )
+                                    file_created += 1
+                                else:
+                                    try:
+                                        with atomic_recalculation():
+                                            # Create race participation
+                                            participation, part_created = RaceParticipation.objects.update_or_create(
+                                                race=race,
+                                                rider=rider,
+                                                defaults={
+                                                    'category': category,
+                                                    'status': 'confirmed',
+                                                    'bib_number': race_number,
+                                                }
+                                            )
+                                            
+                                            if part_created:
+                                                total_participations_created += 1
+                                            else:
+                                                total_participations_updated += 1
+                                            
+                                            # Create race day result
+                                            result, created = RaceDayResult.objects.update_or_create(
+                                                race_day=race_day,
+                                                rider=rider,
+                                                defaults={
+                                                    'position': position,
+                                                    'points_earned': points,
+                                                }
+                                            )
+                                            
+                                            if created:
+                                                file_created += 1
+                                                action = '✓ Created'
+                                            else:
+                                                file_updated += 1
+                                                action = '↻ Updated'
+                                            
+                                            part_status = '(new)' if part_created else '(exists)'
+                                            self.stdout.write(
+                                                f'    {action}: {rider.full_name} - P{position} - {points} pts - {category} {part_status}'
+                                            )
+                                            
+                                    except Exception as e:
+                                        self.stdout.write(
+                                            self.style.ERROR(
+                                                f'    Error creating result for {first_name} {last_name}: {str(e)}'
+                                            )
+                                        )
+                                        file_errors += 1
+                        
+                        # File summary
+                        self.stdout.write(f'  {csv_file}: Created={file_created}, Updated={file_updated}, Skipped={file_skipped}, Errors={file_errors}')
+                        
+                        total_created += file_created
+                        total_updated += file_updated
+                        total_skipped += file_skipped
+                        total_errors += file_errors
+                        
+                    except Exception as e:
+                        self.stdout.write(self.style.ERROR(f'  Error reading {csv_file}: {str(e)}'))
+                        total_errors += 1
+            
         # Final summary
         self.stdout.write(self.style.SUCCESS(f'\n{"=" * 70}'))
         self.stdout.write(self.style.SUCCESS(f'IMPORT COMPLETED!'))
@@ -334,5 +325,210 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING(f'Skipped: {total_skipped}'))
         if total_errors > 0:
             self.stdout.write(self.style.ERROR(f'Errors: {total_errors}'))
+        self.write_ambiguous()
         self.stdout.write(self.style.SUCCESS(f'{"=" * 70}'))
 
+    def write_ambiguous(self):
+        """Report rows that matched several riders (they were skipped)"""
+        ambiguous = self.rider_index.ambiguous_report()
+        if ambiguous:
+            self.stdout.write(self.style.WARNING(f'Ambiguous riders (skipped): {len(ambiguous)}'))
+            for line in ambiguous:
+                self.stdout.write(self.style.WARNING(f'  {line}'))
+
+    def handle_fast(self, base_dir, race_day_dirs, dry_run):
+        """
+        Fast import: parse every race_day-X/*.csv into memory, resolve race
+        days and riders with one query each, then merge all participations
+        and results in one transaction and recalculate each race once
+        """
+        race_day_ids = {
+            int(re.search(r'race_day-(\d+)', race_day_dir).group(1)): race_day_dir
+            for race_day_dir in race_day_dirs
+        }
+        race_days = RaceDay.objects.in_bulk(list(race_day_ids))
+        for race_day_id, race_day_dir in race_day_ids.items():
+            if race_day_id not in race_days:
+                self.stdout.write(
+                    self.style.WARNING(f'Race day not found in database: ID {race_day_id} - Skipping directory')
+                )
+        
+        rows, skipped = self.read_rows(base_dir, race_day_ids, race_days)
+        
+        # One row per race day and rider, the last one read wins
+        results = {}
+        for row in rows:
+            rider = self.find_rider(row['first_name'], row['last_name'], row['race_number'])
+            if rider is None:
+                self.stdout.write(self.style.WARNING(
+                    f'    Rider not found: {row["first_name"]} {row["last_name"]} (License: {row["race_number"]})'
+                ))
+                skipped += 1
+                continue
+            results[(row['race_day'].id, rider.id)] = dict(row, rider=rider)
+        results = list(results.values())
+        
+        race_ids = {row['race_day'].race_id for row in results}
+        existing_results = set(
+            RaceDayResult.objects.filter(race_day_id__in=race_days).values_list('race_day_id', 'rider_id')
+        )
+        existing_participations = set(
+            RaceParticipation.objects.filter(race_id__in=race_ids).values_list('race_id', 'rider_id')
+        )
+        created = sum((row['race_day'].id, row['rider'].id) not in existing_results for row in results)
+        participations = {(row['race_day'].race_id, row['rider'].id): row for row in results}
+        participations_created = sum(key not in existing_participations for key in participations)
+        
+        if dry_run:
+            for row in results:
+                self.stdout.write(
+                    f'    Would create: {row["rider"].full_name} - P{row["position"]} - {row["points"]} pts + participation'
+                )
+        else:
+            with atomic_recalculation(), suspend_recalculation():
+                if connection.vendor == 'postgresql':
+                    self.copy_merge(results)
+                else:
+                    self.bulk_merge(results, participations)
+                
+                # Written without signals: queue each race for a single recalculation on commit
+                for row in results:
+                    schedule_recalculation(RaceDayResult(race_day=row['race_day'], rider=row['rider']))
+        
+        self.stdout.write(self.style.SUCCESS(f'\n{"=" * 70}'))
+        self.stdout.write(self.style.SUCCESS('IMPORT COMPLETED!' if not dry_run else 'DRY RUN COMPLETED!'))
+        self.stdout.write(self.style.SUCCESS(f'{"=" * 70}'))
+        self.stdout.write(self.style.SUCCESS(f'Race days: {len(race_days)}, races: {len(race_ids)}'))
+        self.stdout.write(self.style.SUCCESS('Race Day Results:'))
+        self.stdout.write(self.style.SUCCESS(f'  Created: {created}'))
+        self.stdout.write(self.style.SUCCESS(f'  Updated: {len(results) - created}'))
+        self.stdout.write(self.style.SUCCESS('Race Participations:'))
+        self.stdout.write(self.style.SUCCESS(f'  Created: {participations_created}'))
+        self.stdout.write(self.style.SUCCESS(f'  Updated: {len(participations) - participations_created}'))
+        if skipped > 0:
+            self.stdout.write(self.style.WARNING(f'Skipped: {skipped}'))
+        self.write_ambiguous()
+        self.stdout.write(self.style.SUCCESS(f'{"=" * 70}'))
+
+    def read_rows(self, base_dir, race_day_ids, race_days):
+        """Parse the CSV files of all known race days; returns (rows, skipped)"""
+        rows = []
+        skipped = 0
+        for race_day_id, race_day_dir in race_day_ids.items():
+            race_day = race_days.get(race_day_id)
+            if race_day is None:
+                continue
+            
+            race_day_path = os.path.join(base_dir, race_day_dir)
+            for csv_file in sorted(f for f in os.listdir(race_day_path) if f.endswith('.csv')):
+                category = self.map_category(csv_file)
+                with open(os.path.join(race_day_path, csv_file), 'r', encoding='utf-8') as f:
+                    for row in csv.DictReader(f):
+                        race_number = (row.get('RaceNumber') or '').strip()
+                        first_name = (row.get('FirstName') or '').strip()
+                        last_name = (row.get('LastName') or '').strip()
+                        
+                        if not race_number or not first_name or not last_name:
+                            self.stdout.write(self.style.WARNING(f'    Skipping incomplete row: {row}'))
+                            skipped += 1
+                            continue
+                        
+                        try:
+                            position = int((row.get('Position') or '').strip() or 0)
+                        except ValueError:
+                            self.stdout.write(self.style.WARNING(
+                                f'    Invalid position for {first_name} {last_name}: {row.get("Position")}'
+                            ))
+                            position = 0
+                        
+                        try:
+                            points = float((row.get('Points') or '').strip() or 0)
+                        except ValueError:
+                            self.stdout.write(self.style.WARNING(
+                                f'    Invalid points for {first_name} {last_name}: {row.get("Points")}'
+                            ))
+                            points = 0.0
+                        
+                        rows.append({
+                            'race_day': race_day,
+                            'category': category,
+                            'race_number': race_number,
+                            'first_name': first_name,
+                            'last_name': last_name,
+                            'position': position,
+                            'points': points,
+                        })
+        return rows, skipped
+
+    def copy_merge(self, results):
+        """COPY the rows into a temp table and merge them with INSERT ... ON CONFLICT (PostgreSQL)"""
+        participation_table = connection.ops.quote_name(RaceParticipation._meta.db_table)
+        result_table = connection.ops.quote_name(RaceDayResult._meta.db_table)
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row_number, row in enumerate(results):
+            writer.writerow([
+                row_number, row['race_day'].id, row['race_day'].race_id, row['rider'].id,
+                row['category'], row['race_number'], row['position'], row['points'],
+            ])
+        buffer.seek(0)
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE import_race_day_results ('
+                'row_number integer, race_day_id bigint, race_id bigint, rider_id bigint, category varchar(20), '
+                'bib_number varchar(10), result_position integer, points numeric(10, 2)'
+                ') ON COMMIT DROP'
+            )
+            cursor.copy_expert('COPY import_race_day_results FROM STDIN WITH (FORMAT csv)', buffer)
+            
+            # Like the row by row import, the last row of a rider in a race sets the participation
+            cursor.execute(
+                f'INSERT INTO {participation_table} '
+                '(race_id, rider_id, category, status, bib_number, registration_date, created_at, updated_at) '
+                "SELECT DISTINCT ON (race_id, rider_id) race_id, rider_id, category, 'confirmed', bib_number, "
+                'now(), now(), now() '
+                'FROM import_race_day_results ORDER BY race_id, rider_id, row_number DESC '
+                'ON CONFLICT (race_id, rider_id) DO UPDATE SET '
+                "category = EXCLUDED.category, status = 'confirmed', "
+                'bib_number = EXCLUDED.bib_number, updated_at = EXCLUDED.updated_at'
+            )
+            cursor.execute(
+                f'INSERT INTO {result_table} '
+                '(race_day_id, rider_id, "position", points_earned, penalties, dnf, dsq, notes, created_at, updated_at) '
+                "SELECT race_day_id, rider_id, result_position, points, 0, false, false, '', now(), now() "
+                'FROM import_race_day_results '
+                'ON CONFLICT (race_day_id, rider_id) DO UPDATE SET '
+                '"position" = EXCLUDED."position", points_earned = EXCLUDED.points_earned, '
+                'updated_at = EXCLUDED.updated_at'
+            )
+
+    def bulk_merge(self, results, participations):
+        """Merge with bulk upserts (databases without COPY)"""
+        RaceParticipation.objects.bulk_create(
+            [
+                RaceParticipation(
+                    race_id=race_id, rider=row['rider'], category=row['category'],
+                    status='confirmed', bib_number=row['race_number']
+                )
+                for (race_id, rider_id), row in participations.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['race', 'rider'],
+            update_fields=['category', 'status', 'bib_number', 'updated_at'],
+            batch_size=1000
+        )
+        RaceDayResult.objects.bulk_create(
+            [
+                RaceDayResult(
+                    race_day=row['race_day'], rider=row['rider'],
+                    position=row['position'], points_earned=row['points']
+                )
+                for row in results
+            ],
+            update_conflicts=True,
+            unique_fields=['race_day', 'rider'],
+            update_fields=['position', 'points_earned', 'updated_at'],
+            batch_size=1000
+        )
@@ -16,9 +16,15 @@ Usage:
 
     # Dry run (show what would be done)
     python manage.py recalculate_results --dry-run
+
+    # Recalculate all championships using 4 worker processes
+    python manage.py recalculate_results --workers 4
 """
+import time
+from concurrent.futures import ProcessPoolExecutor
+import django
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
+from django.db import connection, connections, transaction
 from championships.models import Championship
 from races.models import Race
 from results.models import ChampionshipResult, RaceResult, ClubResult
@@ -30,6 +36,33 @@ from results.calculations import (
 )
 
 
+def _init_worker():
+    """Set up Django in a worker process; each worker opens its own DB connection"""
+    django.setup()
+
+
+def _recalculate_race_task(race_id):
+    """Worker task: calculate results of a single race"""
+    started = time.monotonic()
+    race = Race.objects.get(id=race_id)
+    race_results = calculate_race_results(race)
+    return race_id, race_results.count(), time.monotonic() - started
+
+
+def _recalculate_championship_task(championship_id):
+    """Worker task: calculate championship and club standings of a single championship"""
+    started = time.monotonic()
+    championship = Championship.objects.get(id=championship_id)
+    with transaction.atomic():
+        champ_results = calculate_championship_results(championship)
+        club_results = calculate_club_results(championship)
+    dropped_scores = champ_results.filter(lowest_score_dropped__gt=0).count()
+    return (
+        championship_id, champ_results.count(), club_results.count(),
+        dropped_scores, time.monotonic() - started
+    )
+
+
 class Command(BaseCommand):
     help = 'Calculate or recalculate championship results'
 
@@ -59,6 +92,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Show detailed output',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Recalculate all championships in parallel with N worker processes '
+                 '(each shared race is calculated once)',
+        )
 
     def handle(self, *args, **options):
         championship_id = options.get('championship')
@@ -66,6 +105,10 @@ class Command(BaseCommand):
         completed_only = options.get('completed_only')
         dry_run = options.get('dry_run')
         verbose = options.get('verbose')
+        workers = options.get('workers')
+
+        if workers is not None and workers < 1:
+            raise CommandError('--workers must be at least 1')
 
         if dry_run:
             self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
@@ -76,6 +119,8 @@ class Command(BaseCommand):
                 self.recalculate_race(race_id, dry_run, verbose)
             elif championship_id:
                 self.recalculate_championship(championship_id, dry_run, verbose)
+            elif workers:
+                self.recalculate_all_championships_parallel(completed_only, dry_run, verbose, workers)
             else:
                 self.recalculate_all_championships(completed_only, dry_run, verbose)
                 
@@ -232,3 +277,97 @@ class Command(BaseCommand):
             if total_dropped > 0:
                 self.stdout.write(self.style.WARNING(f'  Total: {total_dropped} lowest scores dropped'))
 
+    def recalculate_all_championships_parallel(self, completed_only, dry_run, verbose, workers):
+        """
+        Recalculate all championships across a process pool
+
+        Builds the race -> championship graph so every race is calculated
+        exactly once, then calculates championship standings in parallel.
+        """
+        started = time.monotonic()
+
+        championships = Championship.objects.all()
+        if completed_only:
+            championships = championships.filter(status='completed')
+            self.stdout.write(self.style.MIGRATE_HEADING(f'Recalculating All COMPLETED Championships ({workers} workers)'))
+        else:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'Recalculating All Championships ({workers} workers)'))
+
+        championships = {champ.id: champ for champ in championships}
+
+        # Race -> championships dependency graph
+        race_championships = {}
+        for race_id, championship_id in Race.championships.through.objects.filter(
+            championship_id__in=championships.keys()
+        ).values_list('race_id', 'championship_id'):
+            race_championships.setdefault(race_id, []).append(championship_id)
+
+        race_names = dict(Race.objects.filter(id__in=race_championships.keys()).values_list('id', 'name'))
+        shared_races = sum(1 for champ_ids in race_championships.values() if len(champ_ids) > 1)
+
+        self.stdout.write(f'  Found {len(championships)} championship(s), {len(race_championships)} unique race(s)')
+        if shared_races:
+            self.stdout.write(f'  {shared_races} race(s) shared by several championships are calculated once')
+        self.stdout.write('')
+
+        if not championships:
+            self.stdout.write(self.style.WARNING('  No championships to recalculate'))
+            return
+
+        if dry_run:
+            for champ in championships.values():
+                champ_races = sum(1 for champ_ids in race_championships.values() if champ.id in champ_ids)
+                self.stdout.write(f'  • {champ.name} ({champ.year}): would process {champ_races} races')
+            return
+
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite allows a single writer at a time
+            self.stdout.write(self.style.WARNING('  SQLite does not support parallel writes, using a single process'))
+            self.stdout.write('')
+            workers = 1
+
+        pool = None
+        run = map
+        if workers > 1:
+            # Workers must not inherit the parent's database connections
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+            run = pool.map
+
+        try:
+            # Stage 1: every race exactly once
+            stage_started = time.monotonic()
+            total_race_results = 0
+            for race_id, result_count, elapsed in run(_recalculate_race_task, race_championships.keys()):
+                total_race_results += result_count
+                if verbose:
+                    self.stdout.write(f'  ✓ {race_names[race_id]}: {result_count} results ({elapsed:.2f}s)')
+            races_elapsed = time.monotonic() - stage_started
+
+            # Stage 2: championship and club standings
+            stage_started = time.monotonic()
+            total_riders = 0
+            total_clubs = 0
+            total_dropped = 0
+            for championship_id, rider_count, club_count, dropped_scores, elapsed in run(
+                _recalculate_championship_task, championships.keys()
+            ):
+                total_riders += rider_count
+                total_clubs += club_count
+                total_dropped += dropped_scores
+                if verbose:
+                    champ = championships[championship_id]
+                    self.stdout.write(f'  ✓ {champ.name} ({champ.year}): {rider_count} riders, {club_count} clubs ({elapsed:.2f}s)')
+            championships_elapsed = time.monotonic() - stage_started
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'  Total: {total_race_results} race results, {total_riders} rider results, {total_clubs} club results'))
+        if total_dropped > 0:
+            self.stdout.write(self.style.WARNING(f'  Total: {total_dropped} lowest scores dropped'))
+        self.stdout.write('')
+        self.stdout.write(f'  Races:         {races_elapsed:.2f}s ({len(race_championships)} races)')
+        self.stdout.write(f'  Championships: {championships_elapsed:.2f}s ({len(championships)} championships)')
+        self.stdout.write(f'  Wall clock:    {time.monotonic() - started:.2f}s')
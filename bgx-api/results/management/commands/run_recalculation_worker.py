@@ -0,0 +1,91 @@
+"""
+Django management command that processes queued result recalculations
+
+Usage:
+    # Run the worker (polls for new jobs until stopped)
+    python manage.py run_recalculation_worker
+
+    # Process all pending jobs and exit
+    python manage.py run_recalculation_worker --once
+
+    # Poll every 5 seconds when the queue is empty
+    python manage.py run_recalculation_worker --sleep 5
+
+Finished jobs older than RESULTS_JOB_RETENTION_DAYS are deleted when the
+worker starts and then about once an hour.
+"""
+import time
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+from results.jobs import claim_next_job, prune_finished_jobs, run_job
+
+
+# Seconds between deletions of old finished jobs
+PRUNE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Process queued race and championship recalculation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process all pending jobs and exit',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between polls when the queue is empty (default: 1)',
+        )
+
+    def handle(self, *args, **options):
+        once = options['once']
+        sleep = options['sleep']
+
+        self.stdout.write(self.style.SUCCESS('Recalculation worker started'))
+
+        next_prune = time.monotonic()
+        try:
+            while True:
+                close_old_connections()
+
+                try:
+                    if time.monotonic() >= next_prune:
+                        pruned = prune_finished_jobs()
+                        next_prune = time.monotonic() + PRUNE_INTERVAL
+                        if pruned:
+                            self.stdout.write(f'Deleted {pruned} finished jobs')
+                    job = claim_next_job()
+                except DatabaseError as e:
+                    # Database not ready yet (e.g. migrations still running)
+                    if once:
+                        raise
+                    self.stdout.write(self.style.WARNING(f'Database unavailable: {str(e)}'))
+                    time.sleep(sleep)
+                    continue
+
+                if job is None:
+                    if once:
+                        break
+                    time.sleep(sleep)
+                    continue
+
+                started = time.monotonic()
+                finished = run_job(job)
+                elapsed = time.monotonic() - started
+
+                target = job.race or job.championship
+                if finished is None:
+                    self.stdout.write(self.style.WARNING(
+                        f'Job {job.id}: {target} was claimed again by another worker, outcome not recorded'
+                    ))
+                elif job.status == 'completed':
+                    self.stdout.write(self.style.SUCCESS(f'✓ Job {job.id}: {target} ({elapsed:.2f}s)'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'✗ Job {job.id}: {target} failed - {job.error}'))
+        except KeyboardInterrupt:
+            self.stdout.write('')
+
+        self.stdout.write(self.style.SUCCESS('Recalculation worker stopped'))
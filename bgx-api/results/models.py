@@ -38,6 +38,17 @@ class RaceDayResult(models.Model):
         verbose_name = 'Race Day Result'
         verbose_name_plural = 'Race Day Results'
         unique_together = ['race_day', 'rider']
+        indexes = [
+            # Keyset (cursor) pagination order
+            models.Index(fields=['race_day', 'position', 'id'], name='racedayresult_cursor_idx'),
+            # Race totals: race_day IN (days of a race) AND rider [IN ...],
+            # answered from the index without reading the table
+            models.Index(
+                fields=['race_day', 'rider'],
+                include=['points_earned', 'time_taken', 'penalties', 'dnf', 'dsq'],
+                name='racedayresult_totals_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.rider.full_name} - {self.race_day} - P{self.position}"
@@ -69,6 +80,16 @@ class RaceResult(models.Model):
         verbose_name = 'Race Result'
         verbose_name_plural = 'Race Results'
         unique_together = ['race', 'rider']
+        indexes = [
+            # Keyset (cursor) pagination order
+            models.Index(fields=['race', 'category', 'overall_position', 'id'], name='raceresult_cursor_idx'),
+            # Ranking within a category and championship totals per race
+            models.Index(
+                fields=['race', 'category', '-total_points', 'total_time'],
+                include=['rider'],
+                name='raceresult_ranking_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.rider.full_name} - {self.race.name} - P{self.overall_position}"
@@ -105,6 +126,12 @@ class ChampionshipResult(models.Model):
         verbose_name = 'Championship Result'
         verbose_name_plural = 'Championship Results'
         unique_together = ['championship', 'rider', 'category']
+        indexes = [
+            # Keyset (cursor) pagination order
+            models.Index(fields=['championship', 'category', '-total_points', 'id'], name='champresult_cursor_idx'),
+            # Standings of all categories by points
+            models.Index(fields=['championship', '-total_points'], name='champresult_standings_idx'),
+        ]
     
     def __str__(self):
         return f"{self.rider.full_name} - {self.championship} - {self.total_points} pts"
@@ -133,7 +160,68 @@ class ClubResult(models.Model):
         verbose_name = 'Club Result'
         verbose_name_plural = 'Club Results'
         unique_together = ['championship', 'club']
+        indexes = [
+            # Keyset (cursor) pagination order
+            models.Index(fields=['championship', '-total_points', 'id'], name='clubresult_cursor_idx'),
+        ]
     
     def __str__(self):
         return f"{self.club.name} - {self.championship} - {self.total_points} pts"
 
+
+
+class RecalculationJob(models.Model):
+    """Queued recalculation of a race or championship, processed by the worker command"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    race = models.ForeignKey(
+        'races.Race',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='recalculation_jobs'
+    )
+    championship = models.ForeignKey(
+        'championships.Championship',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='recalculation_jobs'
+    )
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True)
+    # Number of times the job was claimed; identifies the worker allowed to finish it
+    attempts = models.PositiveIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Recalculation Job'
+        verbose_name_plural = 'Recalculation Jobs'
+        constraints = [
+            # At most one pending job per race / championship
+            models.UniqueConstraint(
+                fields=['race'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_race_recalculation'
+            ),
+            models.UniqueConstraint(
+                fields=['championship'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_championship_recalculation'
+            ),
+        ]
+    
+    def __str__(self):
+        target = self.race or self.championship
+        return f"Recalculate {target} - {self.status}"
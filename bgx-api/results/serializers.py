@@ -1,6 +1,12 @@
+import csv
+import io
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from django.utils.dateparse import parse_duration
 from rest_framework import serializers
-from .models import RaceDayResult, RaceResult, ChampionshipResult, ClubResult
-from .calculations import get_points_for_position
+from rest_framework.fields import empty
+from .models import RaceDayResult, RaceResult, ChampionshipResult, ClubResult, RecalculationJob
+from .calculations import get_points_for_position, get_point_table
 
 
 class RaceDayResultSerializer(serializers.ModelSerializer):
@@ -23,12 +29,157 @@ class RaceDayResultSerializer(serializers.ModelSerializer):
         }
     
     def validate(self, data):
-        # Auto-calculate points based on position if not provided
-        if 'points_earned' not in data or data['points_earned'] == 0:
-            data['points_earned'] = get_points_for_position(data['position'])
+        # Auto-calculate points based on position if not provided, on create and
+        # on updates of the position or race day (others keep the stored points)
+        derive_points = self.instance is None or 'position' in data or 'race_day' in data
+        if derive_points and ('points_earned' not in data or data['points_earned'] == 0):
+            race_day = data.get('race_day') or getattr(self.instance, 'race_day', None)
+            position = data['position'] if 'position' in data else getattr(self.instance, 'position', None)
+            if race_day is not None and position is not None:
+                data['points_earned'] = get_points_for_position(position, get_point_table(race_day))
         return data
 
 
+class RaceDayResultEntrySerializer(serializers.Serializer):
+    """
+    One raw result of a bulk submission (rider by id, see RaceDayResultBulkSerializer)
+    Omitted times, penalties and notes keep the stored values of existing results
+    """
+    rider = serializers.IntegerField()
+    position = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+    time_taken = serializers.DurationField(required=False, allow_null=True)
+    penalties = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    points_earned = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+    dnf = serializers.BooleanField(required=False, default=False)
+    dsq = serializers.BooleanField(required=False, default=False)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+
+class RaceDayResultBulkSerializer(serializers.Serializer):
+    """
+    Results of a whole race day, as a JSON list or a CSV upload
+    
+    CSV columns: RaceNumber, Position, Points and optionally FirstName, LastName,
+    Time (HH:MM:SS), Penalties (seconds), DNF, DSQ; riders are matched by the
+    bib number of their confirmed participation. Missing positions are derived
+    from times and missing points from the point schema.
+    
+    All riders are resolved with one query; validated_data['entries'] holds
+    the entries for results.ingestion.ingest_race_day_results.
+    get_race_day() resolves the race day alone, before the results are validated.
+    """
+    race_day = serializers.IntegerField()
+    results = RaceDayResultEntrySerializer(many=True, required=False)
+    file = serializers.FileField(required=False, write_only=True)
+    
+    def validate_race_day(self, value):
+        from races.models import RaceDay
+        
+        race_day = getattr(self, '_race_day', None)
+        if race_day is not None and race_day.pk == value:
+            return race_day
+        
+        race_day = RaceDay.objects.select_related('race').filter(pk=value).first()
+        if race_day is None:
+            raise serializers.ValidationError(f'Race day {value} does not exist.')
+        self._race_day = race_day
+        return race_day
+    
+    def get_race_day(self):
+        """The submitted race day, validated without the results (e.g. for permission checks)"""
+        try:
+            value = self.fields['race_day'].run_validation(self.initial_data.get('race_day', empty))
+            return self.validate_race_day(value)
+        except serializers.ValidationError as e:
+            raise serializers.ValidationError({'race_day': e.detail})
+    
+    def validate(self, data):
+        if ('results' in data) == ('file' in data):
+            raise serializers.ValidationError('Provide either "results" or a CSV "file".')
+        
+        race_day = data['race_day']
+        if 'file' in data:
+            entries = self._entries_from_csv(race_day, data['file'])
+        else:
+            entries = self._entries_from_results(data['results'])
+        
+        if not entries:
+            raise serializers.ValidationError('No results to submit.')
+        
+        rider_counts = Counter(entry['rider'].pk for entry in entries)
+        duplicates = sorted(rider_id for rider_id, count in rider_counts.items() if count > 1)
+        if duplicates:
+            raise serializers.ValidationError(
+                f'Riders submitted more than once: {", ".join(map(str, duplicates))}'
+            )
+        
+        return {'race_day': race_day, 'entries': entries}
+    
+    def _entries_from_results(self, results):
+        from riders.models import Rider
+        
+        riders = Rider.objects.in_bulk([result['rider'] for result in results])
+        missing = sorted({result['rider'] for result in results if result['rider'] not in riders})
+        if missing:
+            raise serializers.ValidationError(
+                {'results': f'Unknown riders: {", ".join(map(str, missing))}'}
+            )
+        return [dict(result, rider=riders[result['rider']]) for result in results]
+    
+    def _entries_from_csv(self, race_day, upload):
+        from races.models import RaceParticipation
+        
+        try:
+            reader = csv.DictReader(io.TextIOWrapper(upload, encoding='utf-8-sig'))
+            rows = list(reader)
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise serializers.ValidationError({'file': f'Invalid CSV file: {e}'})
+        
+        riders_by_bib = {
+            participation.bib_number: participation.rider
+            for participation in RaceParticipation.objects.filter(
+                race_id=race_day.race_id, status='confirmed'
+            ).exclude(bib_number='').select_related('rider')
+        }
+        
+        entries = []
+        errors = []
+        for line, row in enumerate(rows, start=2):
+            race_number = (row.get('RaceNumber') or '').strip()
+            position_str = (row.get('Position') or '').strip()
+            points_str = (row.get('Points') or '').strip()
+            time_str = (row.get('Time') or '').strip()
+            penalties_str = (row.get('Penalties') or '').strip()
+            
+            rider = riders_by_bib.get(race_number)
+            if rider is None:
+                errors.append(f'Line {line}: no confirmed participant with race number "{race_number}"')
+                continue
+            
+            try:
+                time_taken = parse_duration(time_str) if time_str else None
+                if time_str and time_taken is None:
+                    raise ValueError(f'invalid time "{time_str}"')
+                entry = {
+                    'rider': rider,
+                    'position': int(position_str) if position_str else None,
+                    'points_earned': Decimal(points_str) if points_str else None,
+                    'dnf': (row.get('DNF') or '').strip().lower() in ('1', 'true', 'yes', 'x'),
+                    'dsq': (row.get('DSQ') or '').strip().lower() in ('1', 'true', 'yes', 'x'),
+                }
+                if 'Time' in reader.fieldnames:
+                    entry['time_taken'] = time_taken
+                if 'Penalties' in reader.fieldnames:
+                    entry['penalties'] = Decimal(penalties_str) if penalties_str else 0
+                entries.append(entry)
+            except (ValueError, InvalidOperation) as e:
+                errors.append(f'Line {line}: {e}')
+        
+        if errors:
+            raise serializers.ValidationError({'file': errors})
+        return entries
+
+
 class RaceResultSerializer(serializers.ModelSerializer):
     """Serializer for overall race results"""
     rider_name = serializers.CharField(source='rider.full_name', read_only=True)
@@ -71,3 +222,13 @@ class ClubResultSerializer(serializers.ModelSerializer):
                   'total_points', 'created_at', 'updated_at']
         read_only_fields = ['id', 'total_points', 'created_at', 'updated_at']
 
+
+
+class RecalculationJobSerializer(serializers.ModelSerializer):
+    """Serializer for queued recalculation jobs"""
+    
+    class Meta:
+        model = RecalculationJob
+        fields = ['id', 'race', 'championship', 'status', 'error', 'attempts',
+                  'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
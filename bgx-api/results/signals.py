@@ -1,10 +1,193 @@
 """
 Signals for automatic recalculation of results
+
+Saving or deleting a race day result does not recalculate immediately.
+The affected race is queued and recalculated once when the surrounding
+transaction commits, so many result writes in one transaction (or inside
+suspend_recalculation) lead to a single recalculation per race.
+Races queued inside a block that rolls back are dropped again
+(see atomic_recalculation).
+A race with only one changed result is updated incrementally.
+A result moved to another rider or race day queues its previous owner too.
+With RESULTS_ASYNC_RECALCULATION enabled the race is handed to the
+recalculation worker instead (see results/jobs.py).
 """
-from django.db.models.signals import post_save, post_delete
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
 from .models import RaceDayResult
-from .calculations import recalculate_all
+from .calculations import recalculate_races, recalculate_race_day_result
+from .jobs import enqueue_recalculation
+from .cache import bump_versions
+
+
+_state = threading.local()
+
+
+def _pending_changes():
+    """
+    Queued changes per race: race_id -> set of (race_day_id, rider_id)
+    """
+    if not hasattr(_state, 'pending_changes'):
+        _state.pending_changes = {}
+    return _state.pending_changes
+
+
+def _copy_pending_changes():
+    return {race_id: set(changes) for race_id, changes in _pending_changes().items()}
+
+
+def _restore_pending_changes(snapshot):
+    """Forget the changes queued since snapshot was taken"""
+    pending = _pending_changes()
+    pending.clear()
+    pending.update(snapshot)
+
+
+def _is_suspended():
+    return getattr(_state, 'suspend_depth', 0) > 0
+
+
+def run_pending_recalculations():
+    """
+    Recalculate every queued race (and its championships) once
+    A race with a single changed result is updated incrementally
+    In async mode a recalculation job is queued per race instead
+    """
+    from races.models import Race, RaceDay
+    from riders.models import Rider
+    
+    pending = _pending_changes()
+    if not pending:
+        return
+    
+    changes_by_race = dict(pending)
+    pending.clear()
+    
+    # Race day results themselves changed; derived results are invalidated when recalculated
+    bump_versions(race_days={
+        race_day_id for changes in changes_by_race.values() for race_day_id, rider_id in changes
+    })
+    
+    if settings.RESULTS_ASYNC_RECALCULATION:
+        for race in Race.objects.filter(id__in=changes_by_race.keys()):
+            enqueue_recalculation(race=race)
+        return
+    
+    single_changes = [
+        next(iter(changes)) for changes in changes_by_race.values() if len(changes) == 1
+    ]
+    race_days = RaceDay.objects.select_related('race').in_bulk(
+        [race_day_id for race_day_id, rider_id in single_changes]
+    )
+    riders = Rider.objects.in_bulk([rider_id for race_day_id, rider_id in single_changes])
+    
+    full_race_ids = set()
+    for race_id, changes in changes_by_race.items():
+        if len(changes) == 1:
+            race_day_id, rider_id = next(iter(changes))
+            if race_day_id in race_days and rider_id in riders:
+                recalculate_race_day_result(race_days[race_day_id], riders[rider_id])
+                continue
+        full_race_ids.add(race_id)
+    
+    if full_race_ids:
+        races = Race.objects.filter(id__in=full_race_ids).prefetch_related('championships')
+        recalculate_races(races)
+
+
+def schedule_recalculation(race_day_result):
+    """
+    Queue the race of a changed race day result for recalculation after the
+    current transaction commits
+    Outside of a transaction the recalculation runs immediately
+    """
+    _queue_change(race_day_result.race_day.race_id, race_day_result.race_day_id, race_day_result.rider_id)
+
+
+def _schedule_previous_owner(race_day_result):
+    """
+    Also queue the race day and rider a result was loaded with, when it has
+    been moved to another rider or race day (their totals lose the result)
+    """
+    from races.models import RaceDay
+    
+    stored = getattr(race_day_result, '_stored_owner', None)
+    if stored is None or stored == (race_day_result.race_day_id, race_day_result.rider_id):
+        return
+    
+    race_day_id, rider_id = stored
+    race_id = RaceDay.objects.filter(pk=race_day_id).values_list('race_id', flat=True).first()
+    if race_id is not None:
+        _queue_change(race_id, race_day_id, rider_id)
+
+
+def _queue_change(race_id, race_day_id, rider_id):
+    _pending_changes().setdefault(race_id, set()).add((race_day_id, rider_id))
+    
+    if not _is_suspended():
+        # Races already recalculated by an earlier callback make this a no-op
+        transaction.on_commit(run_pending_recalculations)
+
+
+@contextmanager
+def suspend_recalculation():
+    """
+    Suspend signal-driven recalculation during bulk operations
+    Affected races are collected and recalculated once on exit
+    (or when the surrounding transaction commits)
+    
+    When the block raises, the races queued inside it are dropped and nothing
+    is scheduled (the writes roll back with the surrounding transaction).
+    
+    Usage:
+        with suspend_recalculation():
+            for row in rows:
+                RaceDayResult.objects.update_or_create(...)
+    """
+    snapshot = _copy_pending_changes()
+    _state.suspend_depth = getattr(_state, 'suspend_depth', 0) + 1
+    try:
+        yield
+    except Exception:
+        _state.suspend_depth -= 1
+        _restore_pending_changes(snapshot)
+        raise
+    
+    _state.suspend_depth -= 1
+    if not _is_suspended() and _pending_changes():
+        transaction.on_commit(run_pending_recalculations)
+
+
+@contextmanager
+def atomic_recalculation(using=None):
+    """
+    transaction.atomic() for result writes
+    A rollback discards the on_commit recalculation, so the races queued
+    inside the block are dropped from the queue as well.
+    """
+    snapshot = _copy_pending_changes()
+    try:
+        with transaction.atomic(using=using):
+            yield
+            rolled_back = transaction.get_rollback(using=using)
+    except Exception:
+        _restore_pending_changes(snapshot)
+        raise
+    
+    if rolled_back:
+        _restore_pending_changes(snapshot)
+
+
+@receiver(post_init, sender=RaceDayResult)
+def remember_result_owner(sender, instance, **kwargs):
+    """Remember the race day and rider a result was loaded with (no query)"""
+    values = instance.__dict__
+    if 'race_day_id' in values and 'rider_id' in values:
+        instance._stored_owner = (values['race_day_id'], values['rider_id'])
 
 
 @receiver(post_save, sender=RaceDayResult)
@@ -12,8 +195,10 @@ def recalculate_on_result_save(sender, instance, created, **kwargs):
     """
     Recalculate race and championship results when a race day result is saved
     """
-    race = instance.race_day.race
-    recalculate_all(race=race)
+    if not created:
+        _schedule_previous_owner(instance)
+    schedule_recalculation(instance)
+    instance._stored_owner = (instance.race_day_id, instance.rider_id)
 
 
 @receiver(post_delete, sender=RaceDayResult)
@@ -21,6 +206,5 @@ def recalculate_on_result_delete(sender, instance, **kwargs):
     """
     Recalculate race and championship results when a race day result is deleted
     """
-    race = instance.race_day.race
-    recalculate_all(race=race)
-
+    _schedule_previous_owner(instance)
+    schedule_recalculation(instance)
@@ -0,0 +1,152 @@
+"""
+Synthetic season generator
+
+Creates clubs, riders, championships, races, race days, participations and
+race day results in bulk, so calculations and endpoints can be benchmarked
+at a known size. Used by the `benchmark` management command.
+"""
+import random
+from datetime import date, timedelta
+from django.contrib.auth import get_user_model
+from .calculations import get_points_for_positions
+from .models import RaceDayResult
+
+
+def generate_season(clubs=10, riders=200, championships=2, races=6, days=3,
+                    participants=15, categories=4, year=2025, seed=1):
+    """
+    Generate a synthetic season
+    
+    Every race belongs to one championship (round robin) and every third race
+    to the next championship as well. Each race has `participants` confirmed
+    riders in each of `categories` categories; every rider gets a result on
+    every race day with a small share of DNF/DSQ.
+    
+    Returns a dict with the number of created rows per model.
+    """
+    from clubs.models import Club
+    from riders.models import Rider
+    from championships.models import Championship
+    from races.models import Race, RaceDay, RaceParticipation
+    
+    User = get_user_model()
+    rnd = random.Random(seed)
+    
+    category_choices = [choice for choice, _ in RaceParticipation.CATEGORY_CHOICES][:categories]
+    riders_per_race = min(riders, participants * len(category_choices))
+    
+    club_objs = Club.objects.bulk_create([
+        Club(name=f'Synthetic Club {i + 1}') for i in range(clubs)
+    ])
+    
+    users = User.objects.bulk_create([
+        User(username=f'synthetic_rider_{i + 1}', email=f'synthetic_rider_{i + 1}@example.com')
+        for i in range(riders)
+    ])
+    rider_objs = Rider.objects.bulk_create([
+        Rider(
+            user=user,
+            first_name=f'Rider{i + 1}',
+            last_name=f'Synthetic{i + 1}',
+            club=club_objs[i % len(club_objs)] if club_objs and i % 10 else None,
+            is_licensed=True,
+            license_number=str(1000 + i),
+        )
+        for i, user in enumerate(users)
+    ])
+    
+    championship_objs = Championship.objects.bulk_create([
+        Championship(
+            name=f'Synthetic Championship {i + 1}',
+            year=year,
+            start_date=date(year, 1, 1),
+            end_date=date(year, 12, 31),
+            status='active',
+        )
+        for i in range(championships)
+    ])
+    
+    race_objs = Race.objects.bulk_create([
+        Race(
+            name=f'Synthetic Race {i + 1}',
+            location=f'Location {i + 1}',
+            start_date=date(year, 3, 1) + timedelta(weeks=2 * i),
+            end_date=date(year, 3, 1) + timedelta(weeks=2 * i, days=days - 1),
+            status='completed',
+        )
+        for i in range(races)
+    ])
+    
+    race_championships = []
+    for i, race in enumerate(race_objs):
+        if not championship_objs:
+            break
+        indexes = {i % len(championship_objs)}
+        if i % 3 == 0:
+            indexes.add((i + 1) % len(championship_objs))
+        race_championships.extend(
+            Race.championships.through(race=race, championship=championship_objs[index])
+            for index in indexes
+        )
+    Race.championships.through.objects.bulk_create(race_championships)
+    
+    day_types = [choice for choice, _ in RaceDay.TYPE_CHOICES]
+    race_day_objs = RaceDay.objects.bulk_create([
+        RaceDay(
+            race=race,
+            day_number=day + 1,
+            date=race.start_date + timedelta(days=day),
+            type=day_types[day % len(day_types)],
+        )
+        for race in race_objs
+        for day in range(days)
+    ])
+    race_days_by_race = {}
+    for race_day in race_day_objs:
+        race_days_by_race.setdefault(race_day.race_id, []).append(race_day)
+    
+    participations = []
+    results = []
+    for race in race_objs:
+        race_riders = rnd.sample(rider_objs, riders_per_race)
+        by_category = {}
+        for i, rider in enumerate(race_riders):
+            category = category_choices[i % len(category_choices)]
+            by_category.setdefault(category, []).append(rider)
+            participations.append(RaceParticipation(
+                race=race,
+                rider=rider,
+                category=category,
+                status='confirmed',
+                bib_number=rider.license_number,
+            ))
+        
+        for race_day in race_days_by_race[race.id]:
+            for category_riders in by_category.values():
+                order = rnd.sample(category_riders, len(category_riders))
+                points = get_points_for_positions(range(1, len(order) + 1))
+                for position, (rider, rider_points) in enumerate(zip(order, points), start=1):
+                    dnf = rnd.random() < 0.03
+                    dsq = not dnf and rnd.random() < 0.01
+                    results.append(RaceDayResult(
+                        race_day=race_day,
+                        rider=rider,
+                        position=0 if dnf or dsq else position,
+                        time_taken=timedelta(seconds=3000 + 30 * position + rnd.randint(0, 29)),
+                        points_earned=0 if dnf or dsq else rider_points,
+                        dnf=dnf,
+                        dsq=dsq,
+                    ))
+    
+    RaceParticipation.objects.bulk_create(participations, batch_size=1000)
+    RaceDayResult.objects.bulk_create(results, batch_size=1000)
+    
+    return {
+        'clubs': len(club_objs),
+        'riders': len(rider_objs),
+        'championships': len(championship_objs),
+        'races': len(race_objs),
+        'race_days': len(race_day_objs),
+        'participations': len(participations),
+        'race_day_results': len(results),
+    }
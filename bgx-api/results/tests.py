@@ -0,0 +1,569 @@
+import csv
+import io
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from bgx_api.pagination import OptionalCursorPagination
+from championships.models import Championship
+from races.models import Race, RaceDay, RaceParticipation
+from riders.models import Rider
+from .calculations import RANKING_FUNCTIONS, recalculate_all, recalculate_race_day_result
+from .export import _column_names
+from .ingestion import ingest_race_day_results
+from .jobs import claim_next_job, prune_finished_jobs, run_job
+from .models import ChampionshipResult, ClubResult, RaceDayResult, RaceResult, RecalculationJob
+from .signals import _pending_changes, atomic_recalculation, suspend_recalculation
+from .synthetic import generate_season
+
+
+def race_totals(race):
+    return RaceResult.objects.filter(race=race).order_by('rider_id').values_list(
+        'rider_id', 'category', 'total_points', 'overall_position'
+    )
+
+
+def expected_race_totals(race):
+    """Race totals by the original per-rider rules: rider -> (category, points, time)"""
+    expected = {}
+    for participation in RaceParticipation.objects.filter(race=race, status='confirmed'):
+        day_results = list(RaceDayResult.objects.filter(race_day__race=race, rider=participation.rider_id))
+        if not day_results or any(result.dnf or result.dsq for result in day_results):
+            continue
+        
+        total_time = None
+        if all(result.time_taken for result in day_results):
+            total_time = sum((result.time_taken for result in day_results), timedelta())
+            penalties = sum(result.penalties for result in day_results)
+            if penalties:
+                total_time += timedelta(seconds=float(penalties))
+        
+        points = sum(result.points_earned for result in day_results)
+        expected[participation.rider_id] = (participation.category, points, total_time)
+    return expected
+
+
+def expected_standings(championship):
+    """
+    Standings by the original per-rider rules: (rider, category) -> (points,
+    races participated, dropped score)
+    """
+    races = list(championship.races.all())
+    points_by_rider = {}
+    for result in RaceResult.objects.filter(race__in=races):
+        points_by_rider.setdefault((result.rider_id, result.category), []).append(result.total_points)
+    
+    expected = {}
+    for key, points in points_by_rider.items():
+        dropped = Decimal(0)
+        if championship.status == 'completed' and len(points) == len(races) > 1:
+            dropped = min(points)
+        expected[key] = (sum(points) - dropped, len(points), dropped)
+    return expected
+
+
+def standings(championship):
+    return {
+        (result.rider_id, result.category): (result.total_points, result.races_participated, result.lowest_score_dropped)
+        for result in ChampionshipResult.objects.filter(championship=championship)
+    }
+
+
+def club_totals(championship):
+    return dict(ClubResult.objects.filter(championship=championship).values_list('club_id', 'total_points'))
+
+
+class ResultsTestCase(TestCase):
+    """Small synthetic season and a system admin client"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        generate_season(clubs=2, riders=12, championships=1, races=2, days=2, participants=3, categories=2)
+        cls.admin = get_user_model().objects.create(
+            username='admin', email='admin@example.com', is_system_admin=True
+        )
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+
+class RaceDayResultBulkTests(ResultsTestCase):
+    
+    def test_non_organizer_is_rejected_before_validation(self):
+        user = get_user_model().objects.create(username='rider', email='rider@example.com')
+        self.client.force_authenticate(user)
+        response = self.client.post('/api/results/race-day-results/bulk/', {
+            'race_day': RaceDay.objects.first().id,
+            'results': [{'rider': 0, 'position': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+    
+    def test_unknown_race_day(self):
+        response = self.client.post('/api/results/race-day-results/bulk/', {
+            'race_day': 0, 'results': [],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('race_day', response.data)
+    
+    def test_duplicate_riders_are_rejected(self):
+        rider = RaceDayResult.objects.first().rider
+        response = self.client.post('/api/results/race-day-results/bulk/', {
+            'race_day': RaceDay.objects.first().id,
+            'results': [{'rider': rider.id, 'position': 1}, {'rider': rider.id, 'position': 2}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class RaceDayResultUpdateTests(ResultsTestCase):
+    
+    def test_partial_update_position_only(self):
+        result = RaceDayResult.objects.filter(position=1).first()
+        response = self.client.patch(
+            f'/api/results/race-day-results/{result.id}/', {'position': 3}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        result.refresh_from_db()
+        self.assertEqual(result.position, 3)
+    
+    def test_partial_update_without_position(self):
+        result = RaceDayResult.objects.first()
+        # Manually assigned points are kept by updates of other fields
+        RaceDayResult.objects.filter(pk=result.pk).update(points_earned=Decimal('99'))
+        response = self.client.patch(
+            f'/api/results/race-day-results/{result.id}/', {'notes': 'Checked'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        result.refresh_from_db()
+        self.assertEqual((result.notes, result.points_earned), ('Checked', Decimal('99')))
+    
+    def test_moving_result_to_another_rider_recalculates_both(self):
+        recalculate_all(championship=Championship.objects.first())
+        result = RaceDayResult.objects.filter(points_earned__gt=0).select_related('race_day').first()
+        race = result.race_day.race
+        other = Rider.objects.exclude(race_day_results__race_day=result.race_day).first()
+        # Left over from setUpTestData (on_commit never runs inside TestCase)
+        _pending_changes().clear()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/results/race-day-results/{result.id}/', {'rider': other.id}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        
+        # The old rider lost the result: a full recalculation changes nothing
+        totals = list(race_totals(race))
+        recalculate_all(race=race)
+        self.assertEqual(totals, list(race_totals(race)))
+
+
+class CachedEndpointTests(ResultsTestCase):
+    
+    def test_malformed_ids_are_not_found(self):
+        for url in [
+            '/api/championships/abc/standings/',
+            '/api/races/abc/results/',
+            '/api/race-days/abc/results/',
+            '/api/results/club-standings/abc/',
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+    
+    def test_standings_of_existing_championship(self):
+        championship = Championship.objects.first()
+        response = self.client.get(f'/api/championships/{championship.id}/standings/')
+        self.assertEqual(response.status_code, 200)
+    
+    def test_cache_hit_runs_no_queries(self):
+        cache.clear()
+        url = f'/api/results/club-standings/?championship={Championship.objects.first().id}'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual((response.status_code, response['ETag']), (200, etag))
+    
+    def test_validators_change_with_results(self):
+        cache.clear()
+        race_day = RaceDay.objects.first()
+        url = f'/api/race-days/{race_day.id}/results/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            result = RaceDayResult.objects.filter(race_day=race_day).first()
+            result.notes = 'Checked'
+            result.save()
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class RequestMetricsHeaderTests(ResultsTestCase):
+    
+    def test_metrics_headers_only_for_system_admins(self):
+        url = '/api/results/club-standings/'
+        response = self.client.get(url)
+        self.assertIn('X-Query-Count', response)
+        self.assertIn('Server-Timing', response)
+        
+        for user in [None, get_user_model().objects.create(username='rider', email='rider@example.com')]:
+            with self.subTest(user=user):
+                self.client.force_authenticate(user)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('X-Query-Count', response)
+                self.assertNotIn('Server-Timing', response)
+    
+    @override_settings(DEBUG=True)
+    def test_metrics_headers_with_debug(self):
+        self.client.force_authenticate(None)
+        self.assertIn('Server-Timing', self.client.get('/api/results/club-standings/'))
+
+class ClubStandingsTests(ResultsTestCase):
+    
+    def test_malformed_championship_filter_is_rejected(self):
+        for url in ['/api/results/club-standings/', '/api/results/club-standings/export/']:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, {'championship': 'abc'}).status_code, 400)
+
+
+class ExportTests(ResultsTestCase):
+    
+    def test_championship_export_race_columns_follow_race_sequence(self):
+        championship = Championship.objects.first()
+        races = list(championship.races.all())
+        response = self.client.get(f'/api/championships/{championship.id}/export/')
+        self.assertEqual(response.status_code, 200)
+        header = next(csv.reader(line.decode() for line in response.streaming_content))
+        self.assertEqual(
+            [column for column in header if column.startswith('Race_')],
+            _column_names('Race', [race.name for race in races])
+        )
+
+
+class IngestionTests(ResultsTestCase):
+    
+    def test_rider_listed_twice_keeps_last_entry(self):
+        race_day = RaceDay.objects.first()
+        rider = RaceDayResult.objects.filter(race_day=race_day).first().rider
+        
+        results = ingest_race_day_results(race_day, [
+            {'rider': rider, 'position': 1, 'points_earned': Decimal('20')},
+            {'rider': rider, 'position': 5, 'points_earned': Decimal('11')},
+        ])
+        
+        self.assertEqual(len(results), 1)
+        result = RaceDayResult.objects.get(race_day=race_day, rider=rider)
+        self.assertEqual((result.position, result.points_earned), (5, Decimal('11')))
+    
+    def test_reimport_without_time_columns_keeps_stored_values(self):
+        participation = RaceParticipation.objects.filter(status='confirmed').exclude(bib_number='').first()
+        race_day = participation.race.race_days.first()
+        RaceDayResult.objects.filter(race_day=race_day, rider=participation.rider).delete()
+        RaceDayResult.objects.create(
+            race_day=race_day, rider=participation.rider, position=4, points_earned=Decimal('13'),
+            time_taken=timedelta(minutes=42), penalties=Decimal('30'), notes='Checked'
+        )
+        
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(f'RaceNumber,Position,Points\n{participation.bib_number},2,17\n')
+        self.addCleanup(os.remove, f.name)
+        call_command('import_race_results', race_day_id=race_day.id, file=f.name, stdout=io.StringIO())
+        
+        result = RaceDayResult.objects.get(race_day=race_day, rider=participation.rider)
+        self.assertEqual((result.position, result.points_earned), (2, Decimal('17')))
+        self.assertEqual(
+            (result.time_taken, result.penalties, result.notes),
+            (timedelta(minutes=42), Decimal('30'), 'Checked')
+        )
+
+
+class CursorPaginationTests(ResultsTestCase):
+    
+    def walk(self, queryset, ordering, reverse=False):
+        """Ids of all cursor pages of three rows, following the next (or previous) links"""
+        paginator = OptionalCursorPagination()
+        paginator.page_size = 3
+        view = SimpleNamespace(cursor_ordering=ordering)
+        url = '/?pagination=cursor'
+        ids = []
+        while url:
+            request = Request(APIRequestFactory().get(url))
+            page = paginator.paginate_queryset(queryset, request, view)
+            if not ids and reverse:
+                # Start from the last page and walk backwards
+                while paginator.get_next_link():
+                    request = Request(APIRequestFactory().get(paginator.get_next_link()))
+                    page = paginator.paginate_queryset(queryset, request, view)
+            ids = [row.id for row in page] + ids if reverse else ids + [row.id for row in page]
+            url = paginator.get_previous_link() if reverse else paginator.get_next_link()
+        return ids
+    
+    def test_pages_cover_all_rows_in_order(self):
+        ordering = ('race_day_id', 'position', 'id')
+        expected = list(RaceDayResult.objects.order_by(*ordering).values_list('id', flat=True))
+        self.assertEqual(self.walk(RaceDayResult.objects.all(), ordering), expected)
+        self.assertEqual(self.walk(RaceDayResult.objects.all(), ordering, reverse=True), expected)
+    
+    def test_null_values_sort_last(self):
+        recalculate_all(championship=Championship.objects.first())
+        results = list(RaceResult.objects.order_by('id'))
+        self.assertGreater(len(results), 6)
+        for i, result in enumerate(results):
+            result.total_time = None if i % 3 == 0 else timedelta(minutes=i % 4)
+        RaceResult.objects.bulk_update(results, ['total_time'])
+        
+        ordering = ('race_id', 'total_time', 'id')
+        expected = [
+            result.id for result in sorted(results, key=lambda result: (
+                result.race_id, result.total_time is None, result.total_time or timedelta(), result.id
+            ))
+        ]
+        self.assertEqual(self.walk(RaceResult.objects.all(), ordering), expected)
+        self.assertEqual(self.walk(RaceResult.objects.all(), ordering, reverse=True), expected)
+
+
+class RecalculationQueueTests(ResultsTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        # Left over from setUpTestData (on_commit never runs inside TestCase)
+        _pending_changes().clear()
+        self.result = RaceDayResult.objects.first()
+    
+    def test_error_in_suspended_block_drops_queued_races(self):
+        with self.assertRaises(ValueError), transaction.atomic(), suspend_recalculation():
+            self.result.save()
+            raise ValueError
+        self.assertEqual(_pending_changes(), {})
+    
+    def test_rolled_back_transaction_drops_queued_races(self):
+        with self.assertRaises(ValueError), atomic_recalculation():
+            ingest_race_day_results(self.result.race_day, [{'rider': self.result.rider, 'position': 2}])
+            raise ValueError
+        self.assertEqual(_pending_changes(), {})
+        
+        with atomic_recalculation():
+            self.result.save()
+            transaction.set_rollback(True)
+        self.assertEqual(_pending_changes(), {})
+
+
+@override_settings(RESULTS_JOB_STALE_TIMEOUT=60)
+class RecalculationJobTests(ResultsTestCase):
+    
+    def test_system_admins_can_list_jobs(self):
+        self.assertEqual(self.client.get('/api/results/recalculation-jobs/').status_code, 200)
+    
+    def test_stale_running_job_is_claimed_again(self):
+        race = Race.objects.first()
+        running = RecalculationJob.objects.create(
+            race=race, status='running', started_at=timezone.now() - timedelta(seconds=30)
+        )
+        self.assertIsNone(claim_next_job())
+        
+        RecalculationJob.objects.filter(pk=running.pk).update(
+            started_at=timezone.now() - timedelta(seconds=120)
+        )
+        job = claim_next_job()
+        self.assertEqual(job.pk, running.pk)
+        self.assertEqual(job.status, 'running')
+        self.assertGreater(job.started_at, timezone.now() - timedelta(seconds=60))
+    
+    def test_reclaimed_job_keeps_outcome_of_latest_claim(self):
+        RecalculationJob.objects.create(
+            championship=Championship.objects.first(), status='running',
+            started_at=timezone.now() - timedelta(seconds=120)
+        )
+        slow = claim_next_job()
+        RecalculationJob.objects.filter(pk=slow.pk).update(started_at=timezone.now() - timedelta(seconds=120))
+        current = claim_next_job()
+        self.assertEqual((slow.attempts, current.attempts), (1, 2))
+        
+        self.assertIsNotNone(run_job(current))
+        RecalculationJob.objects.filter(pk=current.pk).update(status='running')
+        self.assertIsNone(run_job(slow))
+        self.assertEqual(RecalculationJob.objects.get(pk=slow.pk).status, 'running')
+    
+    def test_prune_deletes_old_finished_jobs(self):
+        races = list(Race.objects.all())
+        old = timezone.now() - timedelta(days=31)
+        jobs = [
+            RecalculationJob.objects.create(race=races[0], status='completed', finished_at=old),
+            RecalculationJob.objects.create(race=races[0], status='failed', finished_at=old),
+            RecalculationJob.objects.create(race=races[0], status='completed', finished_at=timezone.now()),
+            RecalculationJob.objects.create(race=races[0], status='running', started_at=old),
+            RecalculationJob.objects.create(race=races[1], status='pending'),
+        ]
+        
+        self.assertEqual(prune_finished_jobs(0), 0)
+        self.assertEqual(prune_finished_jobs(30), 2)
+        self.assertEqual(
+            set(RecalculationJob.objects.values_list('pk', flat=True)), {job.pk for job in jobs[2:]}
+        )
+
+
+class RaceResultCalculationTests(ResultsTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        # Penalties and missing times on some days
+        results = list(RaceDayResult.objects.order_by('id'))
+        for i, result in enumerate(results):
+            if i % 4 == 1:
+                result.penalties = Decimal('20')
+            if i % 7 == 3:
+                result.time_taken = None
+        RaceDayResult.objects.bulk_update(results, ['penalties', 'time_taken'])
+    
+    def test_totals_match_per_rider_aggregation(self):
+        recalculate_all(championship=Championship.objects.first())
+        
+        for race in Race.objects.all():
+            with self.subTest(race=race.id):
+                actual = {
+                    result.rider_id: (result.category, result.total_points, result.total_time)
+                    for result in RaceResult.objects.filter(race=race)
+                }
+                self.assertEqual(actual, expected_race_totals(race))
+                self.assertTrue(actual)
+    
+    def test_positions_follow_points_then_time(self):
+        recalculate_all(championship=Championship.objects.first())
+        
+        for result in RaceResult.objects.all():
+            ahead = RaceResult.objects.filter(
+                race=result.race_id, category=result.category, overall_position__lt=result.overall_position
+            )
+            for other in ahead:
+                self.assertGreaterEqual(other.total_points, result.total_points)
+                if other.total_points == result.total_points and result.total_time is not None:
+                    self.assertIsNotNone(other.total_time)
+                    self.assertLessEqual(other.total_time, result.total_time)
+    
+    def test_riders_who_no_longer_qualify_are_removed(self):
+        race = Race.objects.first()
+        recalculate_all(race=race)
+        disqualified, cancelled = RaceResult.objects.filter(race=race)[:2]
+        
+        RaceDayResult.objects.filter(
+            race_day__race=race, rider=disqualified.rider_id
+        ).update(dsq=True)
+        RaceParticipation.objects.filter(race=race, rider=cancelled.rider_id).update(status='cancelled')
+        recalculate_all(race=race)
+        
+        riders = set(RaceResult.objects.filter(race=race).values_list('rider_id', flat=True))
+        self.assertNotIn(disqualified.rider_id, riders)
+        self.assertNotIn(cancelled.rider_id, riders)
+        self.assertEqual(riders, set(expected_race_totals(race)))
+
+
+class ChampionshipStandingsTests(ResultsTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.championship = Championship.objects.first()
+        # Riders of every race ride the same category in each, so some complete the season
+        categories = {}
+        for participation in RaceParticipation.objects.order_by('race_id'):
+            category = categories.setdefault(participation.rider_id, participation.category)
+            if participation.category != category:
+                participation.category = category
+                participation.save(update_fields=['category'])
+    
+    def test_standings_match_per_rider_rules(self):
+        for status in ['active', 'completed']:
+            with self.subTest(status=status):
+                Championship.objects.filter(pk=self.championship.pk).update(status=status)
+                self.championship.refresh_from_db()
+                recalculate_all(championship=self.championship)
+                self.assertEqual(standings(self.championship), expected_standings(self.championship))
+    
+    def test_lowest_score_dropped_only_for_riders_of_every_race(self):
+        Championship.objects.filter(pk=self.championship.pk).update(status='completed')
+        self.championship.refresh_from_db()
+        recalculate_all(championship=self.championship)
+        
+        race_count = self.championship.races.count()
+        results = ChampionshipResult.objects.filter(championship=self.championship)
+        self.assertTrue(results.filter(races_participated=race_count, lowest_score_dropped__gt=0).exists())
+        self.assertFalse(results.filter(races_participated__lt=race_count, lowest_score_dropped__gt=0).exists())
+    
+    def test_incremental_update_matches_full_recalculation(self):
+        recalculate_all(championship=self.championship)
+        result = RaceDayResult.objects.filter(dnf=False, dsq=False).select_related('race_day__race').first()
+        RaceDayResult.objects.filter(pk=result.pk).update(points_earned=result.points_earned + 7)
+        
+        recalculate_race_day_result(result.race_day, result.rider)
+        incremental = (
+            list(race_totals(result.race_day.race)), standings(self.championship), club_totals(self.championship)
+        )
+        recalculate_all(championship=self.championship)
+        full = (
+            list(race_totals(result.race_day.race)), standings(self.championship), club_totals(self.championship)
+        )
+        self.assertEqual(incremental, full)
+
+
+class TiePositionTests(ResultsTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        # Four riders in one category of a race, results on its first day only
+        self.race = Race.objects.first()
+        self.race_day = self.race.race_days.first()
+        category = RaceParticipation.objects.filter(race=self.race).values_list('category', flat=True).first()
+        riders = [
+            participation.rider
+            for participation in RaceParticipation.objects.filter(race=self.race, category=category)
+        ]
+        extra = Rider.objects.exclude(race_participations__race=self.race).first()
+        RaceParticipation.objects.create(race=self.race, rider=extra, category=category, status='confirmed')
+        self.riders = sorted(riders + [extra], key=lambda rider: rider.pk)
+    
+    def positions(self, points_and_times):
+        """Positions of self.riders after a recalculation with the given (points, time) per rider"""
+        RaceDayResult.objects.filter(race_day__race=self.race).delete()
+        RaceDayResult.objects.bulk_create([
+            RaceDayResult(race_day=self.race_day, rider=rider, position=0, points_earned=points, time_taken=time)
+            for rider, (points, time) in zip(self.riders, points_and_times)
+        ])
+        recalculate_all(race=self.race)
+        return [RaceResult.objects.get(race=self.race, rider=rider).overall_position for rider in self.riders]
+    
+    def test_tie_modes(self):
+        tied = [
+            (Decimal('40'), None),
+            (Decimal('30'), timedelta(minutes=50)),
+            (Decimal('30'), timedelta(minutes=50)),
+            (Decimal('20'), None),
+        ]
+        for mode, expected in [
+            ('sequential', [1, 2, 3, 4]),  # ties broken by rider
+            ('competition', [1, 2, 2, 4]),
+            ('dense', [1, 2, 2, 3]),
+        ]:
+            with self.subTest(mode=mode), override_settings(RESULTS_TIE_POSITIONS=mode):
+                self.assertEqual(self.positions(tied), expected)
+    
+    def test_time_breaks_points_ties(self):
+        results = [
+            (Decimal('30'), timedelta(minutes=55)),
+            (Decimal('30'), timedelta(minutes=50)),
+            (Decimal('30'), None),
+            (Decimal('40'), timedelta(minutes=60)),
+        ]
+        for mode in RANKING_FUNCTIONS:
+            with self.subTest(mode=mode), override_settings(RESULTS_TIE_POSITIONS=mode):
+                self.assertEqual(self.positions(results), [3, 2, 4, 1])
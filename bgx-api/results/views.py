@@ -1,13 +1,24 @@
+import functools
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied
-from .models import RaceDayResult, RaceResult, ChampionshipResult, ClubResult
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from bgx_api.pagination import OptionalCursorPagination
+from bgx_api.permissions import IsSystemAdmin, is_race_organizer
+from django.conf import settings
+from .models import RaceDayResult, RaceResult, ChampionshipResult, ClubResult, RecalculationJob
 from .serializers import (
-    RaceDayResultSerializer, RaceResultSerializer,
-    ChampionshipResultSerializer, ClubResultSerializer
+    RaceDayResultSerializer, RaceDayResultBulkSerializer, RaceResultSerializer,
+    ChampionshipResultSerializer, ClubResultSerializer,
+    RecalculationJobSerializer
 )
 from .calculations import recalculate_all
+from .jobs import enqueue_recalculation
+from .ingestion import ingest_race_day_results
+from .signals import atomic_recalculation
+from .cache import ALL_RESULTS, cached_response, conditional_response
+from .export import club_standings_csv, export_filename, streaming_csv_response
 
 
 class RaceDayResultViewSet(viewsets.ModelViewSet):
@@ -18,6 +29,13 @@ class RaceDayResultViewSet(viewsets.ModelViewSet):
     """
     queryset = RaceDayResult.objects.select_related('race_day__race', 'rider').all()
     serializer_class = RaceDayResultSerializer
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('race_day_id', 'position', 'id')
+    
+    def get_serializer_class(self):
+        if self.action == 'bulk':
+            return RaceDayResultBulkSerializer
+        return RaceDayResultSerializer
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -30,7 +48,7 @@ class RaceDayResultViewSet(viewsets.ModelViewSet):
         race = race_day.race
         
         # Check if user is system admin or race organizer
-        is_organizer = race.organizers.filter(admins=user).exists()
+        is_organizer = is_race_organizer(self.request, race)
         
         if not (user.is_system_admin or user.is_staff or is_organizer):
             raise PermissionDenied("Only race organizers or administrators can submit results.")
@@ -39,10 +57,10 @@ class RaceDayResultViewSet(viewsets.ModelViewSet):
     
     def perform_update(self, serializer):
         user = self.request.user
-        result = self.get_object()
+        result = serializer.instance
         race = result.race_day.race
         
-        is_organizer = race.organizers.filter(admins=user).exists()
+        is_organizer = is_race_organizer(self.request, race)
         
         if not (user.is_system_admin or user.is_staff or is_organizer):
             raise PermissionDenied("Only race organizers or administrators can update results.")
@@ -53,12 +71,46 @@ class RaceDayResultViewSet(viewsets.ModelViewSet):
         user = self.request.user
         race = instance.race_day.race
         
-        is_organizer = race.organizers.filter(admins=user).exists()
+        is_organizer = is_race_organizer(self.request, race)
         
         if not (user.is_system_admin or user.is_staff or is_organizer):
             raise PermissionDenied("Only race organizers or administrators can delete results.")
         
         instance.delete()
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, MultiPartParser, FormParser])
+    def bulk(self, request):
+        """
+        Submit the results of a whole race day at once, as JSON
+        {"race_day": 1, "results": [{"rider": 5, "position": 1, ...}, ...]}
+        or as a multipart CSV upload (fields race_day and file)
+        
+        Results are upserted in one statement and the race is recalculated once.
+        """
+        serializer = self.get_serializer(data=request.data)
+        
+        # Check the organizer before the submitted results are validated
+        race_day = serializer.get_race_day()
+        user = request.user
+        is_organizer = is_race_organizer(request, race_day.race)
+        
+        if not (user.is_system_admin or user.is_staff or is_organizer):
+            raise PermissionDenied("Only race organizers or administrators can submit results.")
+        
+        serializer.is_valid(raise_exception=True)
+        entries = serializer.validated_data['entries']
+        
+        with atomic_recalculation():
+            ingest_race_day_results(race_day, entries)
+        
+        results = self.get_queryset().filter(
+            race_day=race_day,
+            rider__in=[entry['rider'] for entry in entries]
+        )
+        return Response(
+            RaceDayResultSerializer(results, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
 
 
 class RaceResultViewSet(viewsets.ReadOnlyModelViewSet):
@@ -69,6 +121,8 @@ class RaceResultViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = RaceResult.objects.select_related('race', 'rider__club').all()
     serializer_class = RaceResultSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('race_id', 'category', 'overall_position', 'id')
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -98,6 +152,11 @@ class RaceResultViewSet(viewsets.ReadOnlyModelViewSet):
         if race_id:
             from races.models import Race
             race = Race.objects.get(id=race_id)
+            
+            if settings.RESULTS_ASYNC_RECALCULATION:
+                job = enqueue_recalculation(race=race)
+                return Response(RecalculationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+            
             recalculate_all(race=race)
             return Response({'status': 'Results recalculated for race'})
         
@@ -112,6 +171,8 @@ class ChampionshipResultViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ChampionshipResult.objects.select_related('championship', 'rider__club').all()
     serializer_class = ChampionshipResultSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('championship_id', 'category', '-total_points', 'id')
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -141,6 +202,11 @@ class ChampionshipResultViewSet(viewsets.ReadOnlyModelViewSet):
         if championship_id:
             from championships.models import Championship
             championship = Championship.objects.get(id=championship_id)
+            
+            if settings.RESULTS_ASYNC_RECALCULATION:
+                job = enqueue_recalculation(championship=championship)
+                return Response(RecalculationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+            
             recalculate_all(championship=championship)
             return Response({'status': 'Championship standings recalculated'})
         
@@ -155,14 +221,68 @@ class ClubResultViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ClubResult.objects.select_related('championship', 'club').all()
     serializer_class = ClubResultSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('championship_id', '-total_points', 'id')
+    
+    def get_championship_id(self):
+        """The ?championship= filter as an int (400 when it is not one)"""
+        championship_id = self.request.query_params.get('championship', None)
+        if not championship_id:
+            return None
+        try:
+            return int(championship_id)
+        except ValueError:
+            raise ValidationError({'championship': 'A valid integer is required.'})
     
     def get_queryset(self):
         queryset = super().get_queryset()
         
         # Filter by championship if provided
-        championship_id = self.request.query_params.get('championship', None)
+        championship_id = self.get_championship_id()
         if championship_id:
             queryset = queryset.filter(championship_id=championship_id)
         
         return queryset
+    
+    def list(self, request, *args, **kwargs):
+        """Club standings (cached until the championship is recalculated)"""
+        championship_id = self.get_championship_id()
+        scope = ('championship', championship_id) if championship_id else ALL_RESULTS
+        build_response = functools.partial(super().list, request, *args, **kwargs)
+        return conditional_response(
+            request,
+            self.filter_queryset(self.get_queryset()),
+            lambda: cached_response(request, [scope], build_response),
+            scopes=[scope]
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        # Resolve the standing first: unknown or malformed IDs are a 404
+        instance = self.get_object()
+        build_response = functools.partial(super().retrieve, request, *args, **kwargs)
+        return conditional_response(
+            request,
+            self.get_queryset().filter(pk=instance.pk),
+            lambda: cached_response(request, [ALL_RESULTS], build_response),
+            scopes=[ALL_RESULTS]
+        )
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Download the club standings as CSV (?championship= for a single championship)"""
+        championship_id = self.get_championship_id()
+        header, rows = club_standings_csv(championship_id)
+        name = f'club-standings-{championship_id}' if championship_id else 'club-standings'
+        return streaming_csv_response(export_filename(name, 'club-standings'), header, rows)
+
+
 
+class RecalculationJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only ViewSet for queued recalculation jobs
+    Admins can poll the status of recalculations triggered via the API
+    """
+    queryset = RecalculationJob.objects.select_related('race', 'championship').all()
+    serializer_class = RecalculationJobSerializer
+    permission_classes = [IsSystemAdmin]
+    filterset_fields = ['status', 'race', 'championship']
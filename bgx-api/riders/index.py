@@ -0,0 +1,121 @@
+"""
+In-memory rider index for the result importers
+
+All riders are loaded with one query and keyed by license number,
+normalized full name and username, so matching a CSV row costs a dict
+lookup instead of one or two queries. Lookups that match several riders
+are not guessed: they return None and are collected in `ambiguous`, for
+the importer to report.
+"""
+import unicodedata
+from .models import Rider
+
+
+# Latin letters that look like Cyrillic ones, mixed into Cyrillic names by
+# keyboard layout slips ("Пeтров" with a Latin "e")
+LATIN_TO_CYRILLIC = str.maketrans('aceopxykmthb', 'асеорхукмтнв')
+
+
+def _is_cyrillic(char):
+    return 'CYRILLIC' in unicodedata.name(char, '')
+
+
+def normalize_name(*parts):
+    """
+    Comparable form of a name: NFKC, case-folded, whitespace collapsed and,
+    in words written in Cyrillic, Latin look-alike letters replaced by
+    their Cyrillic counterparts
+    normalize_name(' Иван ', 'ПEТРОВ') == normalize_name('иван петров')
+    """
+    words = unicodedata.normalize('NFKC', ' '.join(part or '' for part in parts)).casefold().split()
+    return ' '.join(
+        word.translate(LATIN_TO_CYRILLIC) if any(_is_cyrillic(char) for char in word) else word
+        for word in words
+    )
+
+
+def normalize_license(license_number):
+    return str(license_number or '').strip().casefold()
+
+
+class RiderIndex:
+    """
+    Riders keyed by license number, normalized full name and username
+    
+    Usage:
+        index = RiderIndex.load()
+        rider, matched_by = index.match(first_name, last_name, license_number)
+        ...
+        for key, riders in index.ambiguous.items():
+            ...
+    """
+    
+    def __init__(self, riders):
+        self.by_license = {}
+        self.by_name = {}
+        self.by_username = {}
+        # Lookup key -> riders it matched, for lookups that could not be decided
+        self.ambiguous = {}
+        
+        for rider in riders:
+            license_number = normalize_license(rider.license_number)
+            if license_number:
+                self.by_license.setdefault(license_number, []).append(rider)
+            self.by_name.setdefault(normalize_name(rider.first_name, rider.last_name), []).append(rider)
+            self.by_username[rider.user.username] = rider
+    
+    @classmethod
+    def load(cls, queryset=None):
+        """Index of all riders (or of queryset), loaded with a single query"""
+        if queryset is None:
+            queryset = Rider.objects.all()
+        return cls(
+            queryset.select_related('user').only(
+                'id', 'first_name', 'last_name', 'license_number', 'club', 'user__id', 'user__username'
+            ).order_by('id')
+        )
+    
+    def _unique(self, key, riders):
+        if len(riders) > 1:
+            self.ambiguous[key] = riders
+            return None
+        return riders[0] if riders else None
+    
+    def get_by_name(self, first_name, last_name):
+        """The rider with this name, None when there is none or several"""
+        name = normalize_name(first_name, last_name)
+        return self._unique(name, self.by_name.get(name, []))
+    
+    def get_by_username(self, username):
+        return self.by_username.get((username or '').strip())
+    
+    def match(self, first_name, last_name, license_number=''):
+        """
+        Rider with this license number and name, otherwise the only rider
+        with this name (license numbers in result files are often stale)
+        Returns (rider, matched_by) with matched_by 'license', 'name' or None
+        """
+        name = normalize_name(first_name, last_name)
+        license_number = normalize_license(license_number)
+        
+        if license_number:
+            riders = [
+                rider for rider in self.by_license.get(license_number, [])
+                if normalize_name(rider.first_name, rider.last_name) == name
+            ]
+            if riders:
+                rider = self._unique(f'{license_number} {name}', riders)
+                return rider, ('license' if rider else None)
+        
+        rider = self._unique(name, self.by_name.get(name, []))
+        return rider, ('name' if rider else None)
+    
+    def ambiguous_report(self):
+        """One line per undecided lookup with the riders it matched"""
+        lines = []
+        for key, riders in self.ambiguous.items():
+            candidates = ', '.join(
+                f'{rider.full_name} (ID {rider.id}, license {rider.license_number or "-"})' for rider in riders
+            )
+            lines.append(f'{key}: {candidates}')
+        return lines
@@ -1,5 +1,22 @@
 from django.db import models
 from django.conf import settings
+from bgx_api.db import SubqueryCount
+
+
+class RiderQuerySet(models.QuerySet):
+    """QuerySet for riders"""
+    
+    def with_counts(self):
+        """Annotate races_participated (confirmed participations)"""
+        from races.models import RaceParticipation
+        
+        return self.annotate(
+            races_participated=SubqueryCount(
+                RaceParticipation.objects.filter(
+                    rider=models.OuterRef('pk'), status='confirmed'
+                ).values('pk')
+            )
+        )
 
 
 class Rider(models.Model):
@@ -51,10 +68,16 @@ class Rider(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = RiderQuerySet.as_manager()
+    
     class Meta:
         ordering = ['last_name', 'first_name']
         verbose_name = 'Rider'
         verbose_name_plural = 'Riders'
+        indexes = [
+            # Keyset (cursor) pagination order
+            models.Index(fields=['last_name', 'first_name', 'id'], name='rider_cursor_idx'),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
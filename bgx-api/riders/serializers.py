@@ -48,6 +48,8 @@ class RiderDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'email', 'created_at', 'updated_at']
     
     def get_races_participated(self, obj):
+        if hasattr(obj, 'races_participated'):
+            return obj.races_participated
         return obj.race_participations.filter(status='confirmed').count()
 
 
@@ -2,6 +2,8 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
+from bgx_api.pagination import OptionalCursorPagination
+from races.models import Race
 from .models import Rider
 from .serializers import (
     RiderListSerializer, RiderSerializer,
@@ -16,7 +18,9 @@ class RiderViewSet(viewsets.ModelViewSet):
     Create: any authenticated user can create their own profile
     Update/Delete: only own profile or system admins
     """
-    queryset = Rider.objects.select_related('user', 'club').all()
+    queryset = Rider.objects.with_counts().select_related('user', 'club')
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('last_name', 'first_name', 'id')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -76,9 +80,9 @@ class RiderViewSet(viewsets.ModelViewSet):
         upcoming = rider.race_participations.filter(
             race__start_date__gte=timezone.now(),
             status='confirmed'
-        ).select_related('race')
+        )
         
-        races = [participation.race for participation in upcoming]
+        races = Race.objects.with_counts().filter(id__in=upcoming.values('race_id'))
         serializer = RaceListSerializer(races, many=True)
         return Response(serializer.data)
 